@@ -4,6 +4,7 @@ Provides debugging and visibility into user context, memory, and system state
 """
 
 import json
+from datetime import datetime
 from typing import Dict, Any, Optional
 from fastapi import APIRouter, HTTPException, Depends, Query
 from fastapi.responses import HTMLResponse, JSONResponse
@@ -184,7 +185,7 @@ async def get_user_context_json(
             "habits": habits,
             "preferences": preferences,
             "proactive_tasks": proactive_tasks,
-            "generated_at": memory_manager._get_current_timestamp().isoformat()
+            "generated_at": datetime.utcnow().isoformat()
         }
         
         return JSONResponse(content=context_data)
@@ -234,7 +235,7 @@ async def get_system_status(
         # Get basic system information
         system_status = {
             "status": "operational",
-            "timestamp": memory_manager._get_current_timestamp().isoformat(),
+            "timestamp": datetime.utcnow().isoformat(),
             "version": "1.0.0",
             "services": {
                 "memory_manager": "operational",
@@ -267,7 +268,7 @@ async def get_system_status(
         return {
             "status": "error",
             "error": str(e),
-            "timestamp": memory_manager._get_current_timestamp().isoformat()
+            "timestamp": datetime.utcnow().isoformat()
         }
 
 
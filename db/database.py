@@ -3,6 +3,7 @@ Database configuration and connection management
 """
 
 import logging
+from contextlib import asynccontextmanager
 import redis.asyncio as redis
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
@@ -40,7 +41,9 @@ async def init_db():
                 async_database_url,
                 echo=settings.DEBUG,
                 pool_pre_ping=True,
-                pool_recycle=300
+                pool_recycle=300,
+                pool_size=25,
+                max_overflow=10
             )
             
             AsyncSessionLocal = async_sessionmaker(
@@ -82,6 +85,17 @@ async def get_db() -> AsyncSession:
             await session.close()
 
 
+@asynccontextmanager
+async def db_session():
+    """Check out one database session for a unit of work and release it after"""
+    sessions = get_db()
+    db = await anext(sessions)
+    try:
+        yield db
+    finally:
+        await sessions.aclose()
+
+
 async def get_redis() -> redis.Redis:
     """Get Redis client"""
     if redis_client is None:
@@ -0,0 +1,28 @@
+-- Migration: Add partial indexes for digest queries
+-- Date: 2024-01-XX
+-- Description: Cover the per-user filters used by the morning/evening digest queries
+-- CONCURRENTLY avoids locking writes on large tables; run outside a transaction
+
+-- Pending reminders (morning list/total, evening "prepare for tomorrow")
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_reminders_pending
+ON reminders(user_id, reminder_time) INCLUDE (title)
+WHERE is_completed = false;
+
+-- Reminders completed today (evening wrap-up)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_reminders_completed
+ON reminders(user_id, updated_at) INCLUDE (title)
+WHERE is_completed = true;
+
+-- Unread email counts
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_email_messages_unread
+ON email_messages(user_id)
+WHERE is_read = false;
+
+-- Today's/tomorrow's calendar events
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_calendar_events_user_start
+ON calendar_events(user_id, start_time);
+
+-- Active users with a phone number, selected each scheduler tick
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_users_active_with_phone
+ON users(id)
+WHERE is_active = true AND phone_number IS NOT NULL;
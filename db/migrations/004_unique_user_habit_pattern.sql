@@ -0,0 +1,16 @@
+-- Migration: One habit row per user and pattern type
+-- Date: 2024-01-XX
+-- Description: Enforce (user_id, pattern_type) uniqueness so habits can be bulk upserted
+
+-- Keep the most recently observed row for each user/pattern pair
+DELETE FROM user_habit h
+USING user_habit newer
+WHERE h.user_id = newer.user_id
+AND h.pattern_type = newer.pattern_type
+AND (COALESCE(h.last_observed, 'epoch'), h.id) < (COALESCE(newer.last_observed, 'epoch'), newer.id);
+
+-- Unique constraint backing INSERT ... ON CONFLICT (user_id, pattern_type)
+ALTER TABLE user_habit ADD CONSTRAINT uq_user_habit_pattern UNIQUE (user_id, pattern_type);
+
+-- The constraint's index covers the same columns; drop the plain one the model used to declare
+DROP INDEX IF EXISTS idx_user_habits_user_pattern;
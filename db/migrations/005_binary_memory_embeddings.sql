@@ -0,0 +1,17 @@
+-- Migration: Store memory embeddings as raw float32 bytes
+-- Date: 2024-01-XX
+-- Description: Replace JSON-text embeddings with BYTEA so recall can read vectors without JSON parsing
+-- Layout: big-endian float32 per component (float4send), matching the application's encoding
+
+ALTER TABLE user_memory ADD COLUMN embedding_bin BYTEA;
+
+-- Convert existing JSON arrays element by element, preserving component order
+UPDATE user_memory m
+SET embedding_bin = (
+    SELECT string_agg(float4send(e.value::float4), ''::bytea ORDER BY e.ordinality)
+    FROM json_array_elements_text(m.embedding::json) WITH ORDINALITY AS e(value, ordinality)
+)
+WHERE m.embedding IS NOT NULL;
+
+ALTER TABLE user_memory DROP COLUMN embedding;
+ALTER TABLE user_memory RENAME COLUMN embedding_bin TO embedding;
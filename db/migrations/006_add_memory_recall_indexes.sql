@@ -0,0 +1,14 @@
+-- Migration: Add composite indexes for memory recall
+-- Date: 2024-01-XX
+-- Description: Let recall_memory's ORDER BY importance_score DESC, timestamp DESC LIMIT n walk an index
+-- CONCURRENTLY avoids locking writes on large tables; run outside a transaction
+
+-- Recall filtered by memory type
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_user_memory_recall_by_type
+ON user_memory(user_id, type, importance_score DESC, timestamp DESC)
+WHERE is_active = true;
+
+-- Recall across all memory types
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_user_memory_recall
+ON user_memory(user_id, importance_score DESC, timestamp DESC)
+WHERE is_active = true;
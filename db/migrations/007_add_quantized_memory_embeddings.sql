@@ -0,0 +1,6 @@
+-- Migration: Add int8-quantized memory embeddings
+-- Date: 2024-01-XX
+-- Description: Compact per-vector scaled int8 copy of each embedding, used to shortlist semantic search candidates
+-- Existing rows keep NULL here; search scores them from the float32 embedding until they are rewritten
+
+ALTER TABLE user_memory ADD COLUMN IF NOT EXISTS embedding_i8 BYTEA;
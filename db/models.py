@@ -3,7 +3,7 @@ Database models for Jarvis Phone AI Assistant
 """
 
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, JSON, Float, Index, UniqueConstraint
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, JSON, Float, Index, UniqueConstraint, LargeBinary
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from db.database import Base
@@ -150,7 +150,8 @@ class UserMemory(Base):
     timestamp = Column(DateTime(timezone=True), server_default=func.now())
     type = Column(String, index=True, nullable=False)  # reminder, schedule, habit, contact, sms, call, email
     content = Column(Text, nullable=False)
-    embedding = Column(Text)  # JSON string of embedding vector
+    embedding = Column(LargeBinary)  # Embedding vector as raw big-endian float32 bytes
+    embedding_i8 = Column(LargeBinary)  # Per-vector scaled int8 copy of the embedding for candidate scoring
     context_data = Column(JSON)  # Additional context like confidence, entities, etc.
     related_memories = Column(JSON)  # IDs of related memories
     importance_score = Column(Float, default=0.5)  # 0.0 to 1.0, higher = more important
@@ -201,10 +202,24 @@ class UserHabit(Base):
     
     # Indexes
     __table_args__ = (
-        Index('idx_user_habits_user_pattern', 'user_id', 'pattern_type'),
+        UniqueConstraint('user_id', 'pattern_type', name='uq_user_habit_pattern'),
         Index('idx_user_habits_confidence', 'confidence'),
         Index('idx_user_habits_next_predicted', 'next_predicted'),
     )
+    
+    def iso_timestamps(self):
+        """(last_observed, next_predicted) as ISO strings, reformatted only after either is reassigned"""
+        last_observed, next_predicted = self.last_observed, self.next_predicted
+        cached = getattr(self, "_iso_cache", None)
+        if cached is None or cached[0] is not last_observed or cached[1] is not next_predicted:
+            cached = (
+                last_observed,
+                next_predicted,
+                last_observed.isoformat() if last_observed else None,
+                next_predicted.isoformat() if next_predicted else None
+            )
+            self._iso_cache = cached
+        return cached[2], cached[3]
 
 
 class ProactiveTask(Base):
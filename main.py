@@ -15,6 +15,8 @@ from config import settings
 from db.database import init_db
 from api.routes import sms, voice, reminders, email, calendar, notes, health, outbound_calls, proactive, communication, oauth, audit, ai_management, telephony, slack, onboarding, digest
 from ai_orchestrator import AIOrchestrator
+from services.habit_engine import close_habit_engine
+from services.oauth_service import close_http_client as close_oauth_http_client
 from config import is_proactive_mode_enabled, is_daily_digest_enabled, settings
 
 # Configure logging
@@ -46,6 +48,8 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     logger.info("Shutting down Jarvis Phone AI Assistant...")
+    await close_habit_engine()
+    await close_oauth_http_client()
 
 
 # Create FastAPI app
@@ -4,77 +4,216 @@ Generates appropriate deep links for different device types and actions
 """
 
 import logging
+import string
+import sys
 import urllib.parse
-from typing import Dict, Any, Optional
+from types import MappingProxyType
+from typing import Dict, Any, Callable, Mapping, NamedTuple, Optional, Tuple
 from utils.logging_config import get_logger
 
 logger = get_logger(__name__)
 
+# Friendly labels for device actions (emoji prefix included)
+_ACTION_LABELS = {
+    "wifi": "⚙️ Wi-Fi",
+    "dnd": "⚙️ Do Not Disturb",
+    "camera": "⚙️ Camera",
+    "photos": "⚙️ Photos",
+    "settings": "⚙️ Settings"
+}
+
+# Translation table deleting every non-digit ASCII character
+_STRIP_NONDIGIT = str.maketrans("", "", "".join(chr(c) for c in range(128) if not chr(c).isdigit()))
+
+# Schemes that are valid with a bare ":" separator (no "//")
+_OPAQUE_SCHEMES = frozenset({"tel", "sms", "smsto", "geo"})
+
+# Device-specific link formats
+_DEVICE_FORMATS = {
+    "ios": {
+        "call": "tel:{phone}",
+        "sms": "sms:{phone}&body={message}",
+        "maps": "https://maps.apple.com/?daddr={destination}",
+        "alarm": "shortcuts://run-shortcut?name=SetAlarm&input={time}",
+        "calendar": "calshow://",
+        "messages": "messages://",
+        "slack": "slack://channel?team={team}&id={channel}",
+        "notion": "notion://",
+        "twitter": "twitter://post?message={message}",
+        "uber": "uber://?action=setPickup&pickup={pickup}&dropoff={dropoff}",
+        "lyft": "lyft://ridetype?pickup={pickup}&destination={dropoff}",
+        "doordash": "doordash://restaurant/{restaurant_id}",
+        "camera": "camera://",
+        "photos": "photos-redirect://",
+        "settings": "App-Prefs://",
+        "wifi": "App-Prefs://root=WIFI",
+        "dnd": "App-Prefs://root=DO_NOT_DISTURB"
+    },
+    "android": {
+        "call": "tel:{phone}",
+        "sms": "smsto:{phone}:{message}",
+        "maps": "geo:0,0?q={destination}",
+        "alarm": "clock://",
+        "calendar": "content://com.android.calendar/time/",
+        "messages": "sms://",
+        "slack": "slack://C{channel_id}",
+        "notion": "notion://",
+        "twitter": "twitter://post?message={message}",
+        "uber": "uber://?action=setPickup&pickup={pickup}&dropoff={dropoff}",
+        "lyft": "lyft://ridetype?pickup={pickup}&destination={dropoff}",
+        "doordash": "doordash://restaurant/{restaurant_id}",
+        "camera": "camera://",
+        "photos": "content://media/external/images/media/",
+        "settings": "android.settings://",
+        "wifi": "android.settings.WIFI_SETTINGS",
+        "dnd": "android.settings.ZEN_MODE_SETTINGS"
+    },
+    "unknown": {
+        "call": "tel:{phone}",
+        "sms": "sms:{phone}?body={message}",
+        "maps": "https://maps.google.com/maps?q={destination}",
+        "alarm": "clock://",
+        "calendar": "calendar://",
+        "messages": "sms://",
+        "slack": "slack://",
+        "notion": "notion://",
+        "twitter": "twitter://",
+        "uber": "uber://",
+        "lyft": "lyft://",
+        "doordash": "doordash://",
+        "camera": "camera://",
+        "photos": "photos://",
+        "settings": "settings://",
+        "wifi": "settings://wifi",
+        "dnd": "settings://dnd"
+    }
+}
+
+
+def _compile_link_builders(
+    device_formats: Dict[str, Dict[str, str]]
+) -> Tuple[Dict[str, Dict[str, Callable[..., str]]], Dict[str, Dict[str, Tuple[str, ...]]]]:
+    """
+    Generate one plain function per (device, action) link format
+    
+    Each format string is translated into a function returning an f-string,
+    so the template is parsed once at import rather than on every call.
+    Like str.format, the generated functions take the fields positionally
+    and ignore extra arguments.
+    
+    Returns:
+        Tuple of (builders, field_order), both keyed by device then action
+    """
+    source = []
+    field_order: Dict[str, Dict[str, Tuple[str, ...]]] = {}
+    for device, formats in device_formats.items():
+        field_order[device] = {}
+        for action, link_format in formats.items():
+            pieces = []
+            fields = []
+            for literal, field_name, format_spec, conversion in string.Formatter().parse(link_format):
+                if literal:
+                    pieces.append(repr(literal))
+                if field_name is None:
+                    continue
+                
+                field = f"a{len(fields)}"
+                if conversion:
+                    field += f"!{conversion}"
+                if format_spec:
+                    field += f":{format_spec}"
+                pieces.append(f"f'{{{field}}}'")
+                fields.append(field_name)
+            
+            args = ", ".join([f"a{i}" for i in range(len(fields))] + ["*_"])
+            body = " ".join(pieces) or "''"
+            source.append(f"def _{device}_{action}({args}):\n    return {body}\n")
+            field_order[device][action] = tuple(fields)
+    
+    namespace: Dict[str, Any] = {}
+    exec("\n".join(source), namespace)
+    
+    builders = {
+        device: {action: namespace[f"_{device}_{action}"] for action in formats}
+        for device, formats in device_formats.items()
+    }
+    return builders, field_order
+
+
+_LINK_BUILDERS, _FIELD_ORDER = _compile_link_builders(_DEVICE_FORMATS)
+
+
+def _default_app_builder(*_) -> str:
+    """Builder for apps without a device-specific format"""
+    return "app://"
+
+
+class _AppSpec(NamedTuple):
+    """Declarative description of an app-specific deeplink"""
+    app_name: str
+    action: str
+    label: str                                  # may reference echo_keys, e.g. "{channel}"
+    quote_keys: Tuple[str, ...] = ()            # params URL-quoted before formatting
+    echo_keys: Tuple[str, ...] = ()             # params copied into the result
+    param_aliases: Mapping[str, str] = MappingProxyType({})  # template field -> params key
+    required_key: Optional[str] = None          # use the raw format when this param is empty
+    suffix_key: Optional[str] = None            # param appended verbatim to the link
+
+
+_APP_SPECS = {
+    "slack": _AppSpec("Slack", "open_slack", "💬 Open Slack #{channel}",
+                      echo_keys=("channel",), param_aliases={"channel_id": "channel"}),
+    "notion": _AppSpec("Notion", "open_notion", "📝 Open Notion", suffix_key="page_id"),
+    "twitter": _AppSpec("Twitter", "open_twitter", "🐦 Open Twitter",
+                        quote_keys=("message",), required_key="message"),
+    "uber": _AppSpec("Uber", "open_uber", "🚗 Open Uber",
+                     quote_keys=("pickup", "dropoff"), echo_keys=("pickup", "dropoff")),
+    "lyft": _AppSpec("Lyft", "open_lyft", "🚗 Open Lyft",
+                     quote_keys=("pickup", "dropoff"), echo_keys=("pickup", "dropoff")),
+    "doordash": _AppSpec("DoorDash", "open_doordash", "🍕 Open DoorDash", required_key="restaurant_id"),
+    "calendar": _AppSpec("Calendar", "open_calendar", "📅 Open Calendar"),
+    "messages": _AppSpec("Messages", "open_messages", "💬 Open Messages")
+}
+
 
 class DeepLinkService:
     """Service for generating deep links across different platforms"""
     
-    def __init__(self):
-        # Device-specific link formats
-        self.device_formats = {
-            "ios": {
-                "call": "tel:{phone}",
-                "sms": "sms:{phone}&body={message}",
-                "maps": "https://maps.apple.com/?daddr={destination}",
-                "alarm": "shortcuts://run-shortcut?name=SetAlarm&input={time}",
-                "calendar": "calshow://",
-                "messages": "messages://",
-                "slack": "slack://channel?team={team}&id={channel}",
-                "notion": "notion://",
-                "twitter": "twitter://post?message={message}",
-                "uber": "uber://?action=setPickup&pickup={pickup}&dropoff={dropoff}",
-                "lyft": "lyft://ridetype?pickup={pickup}&destination={dropoff}",
-                "doordash": "doordash://restaurant/{restaurant_id}",
-                "camera": "camera://",
-                "photos": "photos-redirect://",
-                "settings": "App-Prefs://",
-                "wifi": "App-Prefs://root=WIFI",
-                "dnd": "App-Prefs://root=DO_NOT_DISTURB"
-            },
-            "android": {
-                "call": "tel:{phone}",
-                "sms": "smsto:{phone}:{message}",
-                "maps": "geo:0,0?q={destination}",
-                "alarm": "clock://",
-                "calendar": "content://com.android.calendar/time/",
-                "messages": "sms://",
-                "slack": "slack://C{channel_id}",
-                "notion": "notion://",
-                "twitter": "twitter://post?message={message}",
-                "uber": "uber://?action=setPickup&pickup={pickup}&dropoff={dropoff}",
-                "lyft": "lyft://ridetype?pickup={pickup}&destination={dropoff}",
-                "doordash": "doordash://restaurant/{restaurant_id}",
-                "camera": "camera://",
-                "photos": "content://media/external/images/media/",
-                "settings": "android.settings://",
-                "wifi": "android.settings.WIFI_SETTINGS",
-                "dnd": "android.settings.ZEN_MODE_SETTINGS"
-            },
-            "unknown": {
-                "call": "tel:{phone}",
-                "sms": "sms:{phone}?body={message}",
-                "maps": "https://maps.google.com/maps?q={destination}",
-                "alarm": "clock://",
-                "calendar": "calendar://",
-                "messages": "sms://",
-                "slack": "slack://",
-                "notion": "notion://",
-                "twitter": "twitter://",
-                "uber": "uber://",
-                "lyft": "lyft://",
-                "doordash": "doordash://",
-                "camera": "camera://",
-                "photos": "photos://",
-                "settings": "settings://",
-                "wifi": "settings://wifi",
-                "dnd": "settings://dnd"
-            }
-        }
+    # Result templates; constant fields are prefilled and copied per call
+    _CALL_TEMPLATE = {"url": None, "label": None, "app_name": "Phone", "action": "make_call", "device_type": None}
+    _SMS_TEMPLATE = {"url": None, "label": None, "app_name": "Messages", "action": "send_sms", "device_type": None, "prefilled_message": None}
+    _MAPS_TEMPLATE = {"url": None, "label": None, "app_name": "Maps", "action": "open_maps", "device_type": None, "destination": None}
+    _ALARM_TEMPLATE = {"url": None, "label": None, "app_name": "Clock", "action": "set_alarm", "device_type": None, "alarm_time": None}
+    
+    # Device-specific link formats, shared read-only by all instances
+    device_formats = MappingProxyType(_DEVICE_FORMATS)
+    
+    # Generated link builders plus the param order each expects
+    _link_builders = _LINK_BUILDERS
+    _field_order = _FIELD_ORDER
+    
+    # Populated once by _init_class_tables() after the class is defined
+    _static_app_links: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    _static_action_links: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    
+    @classmethod
+    def _init_class_tables(cls):
+        """Precompute results for (device, action) pairs that never vary with params"""
+        service = cls()
+        for device_type, formats in cls.device_formats.items():
+            for action, link_format in formats.items():
+                if "{" in link_format:
+                    continue
+                
+                cls._static_action_links[(device_type, action)] = service.generate_device_action_link(
+                    action, {}, device_type
+                )
+                
+                spec = _APP_SPECS.get(action)
+                if spec and not spec.echo_keys and not spec.suffix_key:
+                    cls._static_app_links[(device_type, action)] = service._generate_from_spec(
+                        action, {}, device_type
+                    )
     
     def generate_call_link(self, phone_number: str, device_type: str = "unknown") -> Dict[str, Any]:
         """
@@ -91,23 +230,24 @@ class DeepLinkService:
             # Clean phone number
             clean_phone = self._clean_phone_number(phone_number)
             
-            # Get format for device
-            format_template = self.device_formats.get(device_type, self.device_formats["unknown"])
-            call_format = format_template["call"]
+            # Get link builders for device
+            try:
+                builders = self._link_builders[device_type]
+            except KeyError:
+                builders = self._link_builders["unknown"]
+            build_call = builders["call"]
             
             # Generate link
-            deeplink = call_format.format(phone=clean_phone)
+            deeplink = build_call(clean_phone)
             
-            return {
-                "url": deeplink,
-                "label": f"📞 Call {phone_number}",
-                "app_name": "Phone",
-                "action": "make_call",
-                "device_type": device_type
-            }
+            result = self._CALL_TEMPLATE.copy()
+            result["url"] = deeplink
+            result["label"] = f"📞 Call {phone_number}"
+            result["device_type"] = device_type
+            return result
             
         except Exception as e:
-            logger.error(f"Error generating call link: {e}")
+            logger.error("Error generating call link: %s", e)
             return {"url": "", "label": "Call failed", "error": str(e)}
     
     def generate_sms_link(self, phone_number: str, message: str, device_type: str = "unknown") -> Dict[str, Any]:
@@ -127,24 +267,25 @@ class DeepLinkService:
             clean_phone = self._clean_phone_number(phone_number)
             clean_message = urllib.parse.quote(message)
             
-            # Get format for device
-            format_template = self.device_formats.get(device_type, self.device_formats["unknown"])
-            sms_format = format_template["sms"]
+            # Get link builders for device
+            try:
+                builders = self._link_builders[device_type]
+            except KeyError:
+                builders = self._link_builders["unknown"]
+            build_sms = builders["sms"]
             
             # Generate link
-            deeplink = sms_format.format(phone=clean_phone, message=clean_message)
+            deeplink = build_sms(clean_phone, clean_message)
             
-            return {
-                "url": deeplink,
-                "label": f"✉️ Text {phone_number}",
-                "app_name": "Messages",
-                "action": "send_sms",
-                "device_type": device_type,
-                "prefilled_message": message
-            }
+            result = self._SMS_TEMPLATE.copy()
+            result["url"] = deeplink
+            result["label"] = f"✉️ Text {phone_number}"
+            result["device_type"] = device_type
+            result["prefilled_message"] = message
+            return result
             
         except Exception as e:
-            logger.error(f"Error generating SMS link: {e}")
+            logger.error("Error generating SMS link: %s", e)
             return {"url": "", "label": "SMS failed", "error": str(e)}
     
     def generate_maps_link(self, destination: str, device_type: str = "unknown") -> Dict[str, Any]:
@@ -162,24 +303,25 @@ class DeepLinkService:
             # Clean destination
             clean_destination = urllib.parse.quote(destination)
             
-            # Get format for device
-            format_template = self.device_formats.get(device_type, self.device_formats["unknown"])
-            maps_format = format_template["maps"]
+            # Get link builders for device
+            try:
+                builders = self._link_builders[device_type]
+            except KeyError:
+                builders = self._link_builders["unknown"]
+            build_maps = builders["maps"]
             
             # Generate link
-            deeplink = maps_format.format(destination=clean_destination)
+            deeplink = build_maps(clean_destination)
             
-            return {
-                "url": deeplink,
-                "label": f"🗺️ Directions to {destination}",
-                "app_name": "Maps",
-                "action": "open_maps",
-                "device_type": device_type,
-                "destination": destination
-            }
+            result = self._MAPS_TEMPLATE.copy()
+            result["url"] = deeplink
+            result["label"] = f"🗺️ Directions to {destination}"
+            result["device_type"] = device_type
+            result["destination"] = destination
+            return result
             
         except Exception as e:
-            logger.error(f"Error generating maps link: {e}")
+            logger.error("Error generating maps link: %s", e)
             return {"url": "", "label": "Maps failed", "error": str(e)}
     
     def generate_alarm_link(self, time: str, device_type: str = "unknown") -> Dict[str, Any]:
@@ -194,29 +336,30 @@ class DeepLinkService:
             Dictionary with deeplink and metadata
         """
         try:
-            # Get format for device
-            format_template = self.device_formats.get(device_type, self.device_formats["unknown"])
-            alarm_format = format_template["alarm"]
+            # Get link builders for device
+            try:
+                builders = self._link_builders[device_type]
+            except KeyError:
+                builders = self._link_builders["unknown"]
+            build_alarm = builders["alarm"]
             
             # Generate link
             if device_type == "ios":
                 # iOS Shortcuts format
-                deeplink = alarm_format.format(time=urllib.parse.quote(time))
+                deeplink = build_alarm(urllib.parse.quote(time))
             else:
                 # Android and others
-                deeplink = alarm_format
+                deeplink = build_alarm()
             
-            return {
-                "url": deeplink,
-                "label": f"⏰ Set alarm for {time}",
-                "app_name": "Clock",
-                "action": "set_alarm",
-                "device_type": device_type,
-                "alarm_time": time
-            }
+            result = self._ALARM_TEMPLATE.copy()
+            result["url"] = deeplink
+            result["label"] = f"⏰ Set alarm for {time}"
+            result["device_type"] = device_type
+            result["alarm_time"] = time
+            return result
             
         except Exception as e:
-            logger.error(f"Error generating alarm link: {e}")
+            logger.error("Error generating alarm link: %s", e)
             return {"url": "", "label": "Alarm failed", "error": str(e)}
     
     def generate_app_link(
@@ -239,40 +382,35 @@ class DeepLinkService:
         try:
             app_name_lower = app_name.lower()
             
-            # Get format for device
-            format_template = self.device_formats.get(device_type, self.device_formats["unknown"])
-            
-            if app_name_lower == "slack":
-                return self._generate_slack_link(params, device_type)
-            elif app_name_lower == "notion":
-                return self._generate_notion_link(params, device_type)
-            elif app_name_lower == "twitter":
-                return self._generate_twitter_link(params, device_type)
-            elif app_name_lower == "uber":
-                return self._generate_uber_link(params, device_type)
-            elif app_name_lower == "lyft":
-                return self._generate_lyft_link(params, device_type)
-            elif app_name_lower == "doordash":
-                return self._generate_doordash_link(params, device_type)
-            elif app_name_lower == "calendar":
-                return self._generate_calendar_link(params, device_type)
-            elif app_name_lower == "messages":
-                return self._generate_messages_link(params, device_type)
-            else:
-                # Generic app link
-                app_format = format_template.get(app_name_lower, "app://")
-                deeplink = app_format.format(**params)
-                
-                return {
-                    "url": deeplink,
-                    "label": f"📱 Open {app_name}",
-                    "app_name": app_name,
-                    "action": "open_app",
-                    "device_type": device_type
-                }
-                
+            static_link = self._static_app_links.get((device_type, app_name_lower))
+            if static_link is not None:
+                return static_link.copy()
+            
+            if app_name_lower in _APP_SPECS:
+                return self._generate_from_spec(app_name_lower, params, device_type)
+            
+            # Get link builders for device
+            try:
+                builders = self._link_builders[device_type]
+                field_order = self._field_order[device_type].get(app_name_lower, ())
+            except KeyError:
+                builders = self._link_builders["unknown"]
+                field_order = self._field_order["unknown"].get(app_name_lower, ())
+            
+            # Generic app link
+            build_app = builders.get(app_name_lower, _default_app_builder)
+            deeplink = build_app(*[params[field] for field in field_order])
+            
+            return {
+                "url": deeplink,
+                "label": f"📱 Open {app_name}",
+                "app_name": app_name,
+                "action": "open_app",
+                "device_type": device_type
+            }
+            
         except Exception as e:
-            logger.error(f"Error generating app link: {e}")
+            logger.error("Error generating app link: %s", e)
             return {"url": "", "label": f"Open {app_name} failed", "error": str(e)}
     
     def generate_device_action_link(
@@ -293,227 +431,102 @@ class DeepLinkService:
             Dictionary with deeplink and metadata
         """
         try:
-            # Get format for device
-            format_template = self.device_formats.get(device_type, self.device_formats["unknown"])
-            action_format = format_template.get(action, "")
-            
-            if not action_format:
+            static_link = self._static_action_links.get((device_type, action))
+            if static_link is not None:
+                return static_link.copy()
+            
+            # Get link builders for device
+            try:
+                builders = self._link_builders[device_type]
+                field_order = self._field_order[device_type]
+            except KeyError:
+                builders = self._link_builders["unknown"]
+                field_order = self._field_order["unknown"]
+            build_action = builders.get(action)
+            
+            if build_action is None:
                 return {"url": "", "label": f"{action} not supported", "error": "Action not supported"}
             
             # Generate link
-            deeplink = action_format.format(**params)
+            field_order = field_order[action]
+            deeplink = build_action(*[params[field] for field in field_order])
             
             # Generate friendly label
-            action_labels = {
-                "wifi": "Wi-Fi",
-                "dnd": "Do Not Disturb",
-                "camera": "Camera",
-                "photos": "Photos",
-                "settings": "Settings"
-            }
-            
-            label = action_labels.get(action, action.title())
+            label = _ACTION_LABELS.get(action)
+            if label is None:
+                label = sys.intern(f"⚙️ {action.title()}")
             
             return {
                 "url": deeplink,
-                "label": f"⚙️ {label}",
+                "label": label,
                 "app_name": "Settings",
-                "action": f"toggle_{action}",
+                "action": sys.intern(f"toggle_{action}"),
                 "device_type": device_type,
                 "device_action": action
             }
             
         except Exception as e:
-            logger.error(f"Error generating device action link: {e}")
+            logger.error("Error generating device action link: %s", e)
             return {"url": "", "label": f"{action} failed", "error": str(e)}
     
-    def _generate_slack_link(self, params: Dict[str, Any], device_type: str) -> Dict[str, Any]:
-        """Generate Slack deeplink"""
+    def _generate_from_spec(self, app_key: str, params: Dict[str, Any], device_type: str) -> Dict[str, Any]:
+        """Generate an app-specific deeplink from its entry in _APP_SPECS"""
+        spec = _APP_SPECS[app_key]
         try:
-            channel = params.get("channel", "")
-            team = params.get("team", "")
-            
-            format_template = self.device_formats.get(device_type, self.device_formats["unknown"])
-            slack_format = format_template["slack"]
-            
-            if device_type == "ios":
-                deeplink = slack_format.format(team=team, channel=channel)
+            try:
+                builders = self._link_builders[device_type]
+                field_order = self._field_order[device_type]
+            except KeyError:
+                builders = self._link_builders["unknown"]
+                field_order = self._field_order["unknown"]
+            field_order = field_order[app_key]
+            
+            if spec.required_key and not params.get(spec.required_key, ""):
+                try:
+                    deeplink = self.device_formats[device_type][app_key]
+                except KeyError:
+                    deeplink = self.device_formats["unknown"][app_key]
             else:
-                # Android uses channel ID
-                deeplink = slack_format.format(channel_id=channel)
-            
-            return {
-                "url": deeplink,
-                "label": f"💬 Open Slack #{channel}",
-                "app_name": "Slack",
-                "action": "open_slack",
-                "device_type": device_type,
-                "channel": channel
-            }
-            
-        except Exception as e:
-            logger.error(f"Error generating Slack link: {e}")
-            return {"url": "", "label": "Slack failed", "error": str(e)}
-    
-    def _generate_notion_link(self, params: Dict[str, Any], device_type: str) -> Dict[str, Any]:
-        """Generate Notion deeplink"""
-        try:
-            page_id = params.get("page_id", "")
-            format_template = self.device_formats.get(device_type, self.device_formats["unknown"])
-            notion_format = format_template["notion"]
-            
-            deeplink = f"{notion_format}{page_id}" if page_id else notion_format
-            
-            return {
-                "url": deeplink,
-                "label": "📝 Open Notion",
-                "app_name": "Notion",
-                "action": "open_notion",
-                "device_type": device_type
-            }
-            
-        except Exception as e:
-            logger.error(f"Error generating Notion link: {e}")
-            return {"url": "", "label": "Notion failed", "error": str(e)}
-    
-    def _generate_twitter_link(self, params: Dict[str, Any], device_type: str) -> Dict[str, Any]:
-        """Generate Twitter deeplink"""
-        try:
-            message = params.get("message", "")
-            format_template = self.device_formats.get(device_type, self.device_formats["unknown"])
-            twitter_format = format_template["twitter"]
-            
-            deeplink = twitter_format.format(message=urllib.parse.quote(message)) if message else twitter_format
-            
-            return {
+                args = []
+                for field in field_order:
+                    value = params.get(spec.param_aliases.get(field, field), "")
+                    args.append(urllib.parse.quote(value) if field in spec.quote_keys else value)
+                deeplink = builders[app_key](*args)
+            
+            if spec.suffix_key:
+                suffix = params.get(spec.suffix_key, "")
+                if suffix:
+                    deeplink = f"{deeplink}{suffix}"
+            
+            echoed = {key: params.get(key, "") for key in spec.echo_keys}
+            result = {
                 "url": deeplink,
-                "label": "🐦 Open Twitter",
-                "app_name": "Twitter",
-                "action": "open_twitter",
+                "label": spec.label.format(**echoed) if echoed else spec.label,
+                "app_name": spec.app_name,
+                "action": spec.action,
                 "device_type": device_type
             }
+            result.update(echoed)
+            return result
             
         except Exception as e:
-            logger.error(f"Error generating Twitter link: {e}")
-            return {"url": "", "label": "Twitter failed", "error": str(e)}
-    
-    def _generate_uber_link(self, params: Dict[str, Any], device_type: str) -> Dict[str, Any]:
-        """Generate Uber deeplink"""
-        try:
-            pickup = params.get("pickup", "")
-            dropoff = params.get("dropoff", "")
-            
-            format_template = self.device_formats.get(device_type, self.device_formats["unknown"])
-            uber_format = format_template["uber"]
-            
-            deeplink = uber_format.format(
-                pickup=urllib.parse.quote(pickup),
-                dropoff=urllib.parse.quote(dropoff)
-            )
-            
-            return {
-                "url": deeplink,
-                "label": "🚗 Open Uber",
-                "app_name": "Uber",
-                "action": "open_uber",
-                "device_type": device_type,
-                "pickup": pickup,
-                "dropoff": dropoff
-            }
-            
-        except Exception as e:
-            logger.error(f"Error generating Uber link: {e}")
-            return {"url": "", "label": "Uber failed", "error": str(e)}
-    
-    def _generate_lyft_link(self, params: Dict[str, Any], device_type: str) -> Dict[str, Any]:
-        """Generate Lyft deeplink"""
-        try:
-            pickup = params.get("pickup", "")
-            dropoff = params.get("dropoff", "")
-            
-            format_template = self.device_formats.get(device_type, self.device_formats["unknown"])
-            lyft_format = format_template["lyft"]
-            
-            deeplink = lyft_format.format(
-                pickup=urllib.parse.quote(pickup),
-                dropoff=urllib.parse.quote(dropoff)
-            )
-            
-            return {
-                "url": deeplink,
-                "label": "🚗 Open Lyft",
-                "app_name": "Lyft",
-                "action": "open_lyft",
-                "device_type": device_type,
-                "pickup": pickup,
-                "dropoff": dropoff
-            }
-            
-        except Exception as e:
-            logger.error(f"Error generating Lyft link: {e}")
-            return {"url": "", "label": "Lyft failed", "error": str(e)}
-    
-    def _generate_doordash_link(self, params: Dict[str, Any], device_type: str) -> Dict[str, Any]:
-        """Generate DoorDash deeplink"""
-        try:
-            restaurant_id = params.get("restaurant_id", "")
-            format_template = self.device_formats.get(device_type, self.device_formats["unknown"])
-            doordash_format = format_template["doordash"]
-            
-            deeplink = doordash_format.format(restaurant_id=restaurant_id) if restaurant_id else doordash_format
-            
-            return {
-                "url": deeplink,
-                "label": "🍕 Open DoorDash",
-                "app_name": "DoorDash",
-                "action": "open_doordash",
-                "device_type": device_type
-            }
-            
-        except Exception as e:
-            logger.error(f"Error generating DoorDash link: {e}")
-            return {"url": "", "label": "DoorDash failed", "error": str(e)}
-    
-    def _generate_calendar_link(self, params: Dict[str, Any], device_type: str) -> Dict[str, Any]:
-        """Generate calendar deeplink"""
-        try:
-            format_template = self.device_formats.get(device_type, self.device_formats["unknown"])
-            calendar_format = format_template["calendar"]
-            
-            return {
-                "url": calendar_format,
-                "label": "📅 Open Calendar",
-                "app_name": "Calendar",
-                "action": "open_calendar",
-                "device_type": device_type
-            }
-            
-        except Exception as e:
-            logger.error(f"Error generating calendar link: {e}")
-            return {"url": "", "label": "Calendar failed", "error": str(e)}
-    
-    def _generate_messages_link(self, params: Dict[str, Any], device_type: str) -> Dict[str, Any]:
-        """Generate messages deeplink"""
-        try:
-            format_template = self.device_formats.get(device_type, self.device_formats["unknown"])
-            messages_format = format_template["messages"]
-            
-            return {
-                "url": messages_format,
-                "label": "💬 Open Messages",
-                "app_name": "Messages",
-                "action": "open_messages",
-                "device_type": device_type
-            }
-            
-        except Exception as e:
-            logger.error(f"Error generating messages link: {e}")
-            return {"url": "", "label": "Messages failed", "error": str(e)}
+            logger.error("Error generating %s link: %s", spec.app_name, e)
+            return {"url": "", "label": f"{spec.app_name} failed", "error": str(e)}
     
     def _clean_phone_number(self, phone: str) -> str:
         """Clean and format phone number for deeplinks"""
+        # Fast path for already-clean US numbers
+        n = len(phone)
+        if (n == 10 or n == 11) and phone.isdigit():
+            if n == 10:
+                return "1" + phone  # Assume US number
+            if phone[0] == "1":
+                return phone
+        
         # Remove all non-digit characters
-        clean = ''.join(filter(str.isdigit, phone))
+        clean = phone.translate(_STRIP_NONDIGIT)
+        if not clean.isascii():
+            clean = ''.join(filter(str.isdigit, clean))
         
         # Ensure it starts with country code
         if len(clean) == 10:
@@ -529,7 +542,10 @@ class DeepLinkService:
     def get_supported_actions(self, device_type: str = "unknown") -> Dict[str, Any]:
         """Get list of supported actions for a device type"""
         try:
-            format_template = self.device_formats.get(device_type, self.device_formats["unknown"])
+            try:
+                format_template = self.device_formats[device_type]
+            except KeyError:
+                format_template = self.device_formats["unknown"]
             
             return {
                 "device_type": device_type,
@@ -538,28 +554,22 @@ class DeepLinkService:
             }
             
         except Exception as e:
-            logger.error(f"Error getting supported actions: {e}")
+            logger.error("Error getting supported actions: %s", e)
             return {"device_type": device_type, "supported_actions": [], "total_actions": 0}
     
     def validate_deeplink(self, deeplink: str) -> bool:
         """Validate if a deeplink is properly formatted"""
         try:
             # Basic validation - check if it's a valid URL scheme
-            if deeplink.startswith(("tel:", "sms:", "smsto:", "geo:", "camera://", "photos://")):
-                return True
-            
-            # Check for valid HTTP/HTTPS URLs
-            if deeplink.startswith(("http://", "https://")):
-                return True
-            
-            # Check for custom schemes
-            if "://" in deeplink:
+            idx = deeplink.find(":")
+            if idx > 0 and deeplink[:idx] in _OPAQUE_SCHEMES:
                 return True
             
-            return False
+            # HTTP/HTTPS and custom schemes (camera://, photos://, ...)
+            return "://" in deeplink
             
         except Exception as e:
-            logger.error(f"Error validating deeplink: {e}")
+            logger.error("Error validating deeplink: %s", e)
             return False
     
     def tel_link(self, phone_number: str, device_type: str = "unknown") -> Dict[str, Any]:
@@ -579,3 +589,6 @@ class DeepLinkService:
         if params is None:
             params = {}
         return self.generate_app_link(app_name, params, device_type)
+
+
+DeepLinkService._init_class_tables()
@@ -5,52 +5,234 @@ Handles morning and evening digests with timezone support
 
 import logging
 import asyncio
-from typing import Dict, Any, List, Optional
+from collections import defaultdict
+from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime, time, timedelta
-import pytz
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from sqlalchemy import text
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
-from apscheduler.jobstores.memory import MemoryJobStore
+from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
 
-from db.database import get_db
+from config import settings
+
+from db.database import db_session
 from db.models import User, UserPreference, CalendarEvent, EmailMessage, Reminder
 from services.memory_manager import memory_manager
-from services.habit_engine import habit_engine
 # from services.proactive_agent import proactive_agent  # Circular import - will import when needed
 # from telephony.telephony_manager import telephony_manager  # Circular import - will import when needed
+from utils.constants import (
+    DIGEST_CONCURRENCY, DIGEST_SMS_RATE_PER_SEC, DIGEST_USER_PAGE_SIZE, MORNING_DIGEST_HOUR, EVENING_DIGEST_HOUR,
+    USER_LOOKUP_CACHE_TTL, USER_LOOKUP_CACHE_SIZE, DIGEST_CONTENT_CACHE_SIZE
+)
 from utils.logging_config import get_logger
 
 logger = get_logger(__name__)
 
+# Static digest lines
+MORNING_GREETING = "🌅 Good morning! Here's your daily digest:"
+MORNING_NO_EVENTS = "📅 Today: No events scheduled"
+MORNING_INBOX_CLEAN = "📧 Inbox is clean!"
+MORNING_SUGGESTIONS_HEADER = "💡 Suggestions:"
+MORNING_WEATHER = "🌤️ Weather: Check your weather app for today's forecast"
+MORNING_SIGNOFF = "Have a great day! Reply with any questions."
+EVENING_GREETING = "🌙 Good evening! Here's your wrap-up:"
+EVENING_NO_EVENTS = "📅 Tomorrow: No events scheduled"
+EVENING_ROUTINE = (
+    "🌙 Evening routine:\n"
+    "1. Review tomorrow's schedule\n"
+    "2. Set out clothes/items needed\n"
+    "3. Wind down and relax"
+)
+EVENING_SIGNOFF = "Sleep well! I'll see you in the morning."
+
+# Constant tails appended to every digest, joined once at import
+MORNING_FOOTER = "\n".join((MORNING_WEATHER, MORNING_SIGNOFF))
+EVENING_FOOTER = "\n".join((EVENING_ROUTINE, EVENING_SIGNOFF))
+
+
+# Digest queries are built once so SQLAlchemy reuses their compiled form and
+# asyncpg's per-connection prepared statement cache sees identical SQL every run.
+# Recipients: the timezone preference is a JSONB string, unwrapped to text by #>> '{}';
+# names Postgres doesn't know fall through to the next source, so one bad value can't
+# fail the page
+_DIGEST_RECIPIENTS_SQL = text("""
+    WITH zones AS MATERIALIZED (SELECT name FROM pg_timezone_names)
+    SELECT id, phone_number, name, timezone, local_hour
+    FROM (
+        SELECT u.id, u.phone_number, u.name, tz.timezone,
+               EXTRACT(HOUR FROM (now() AT TIME ZONE tz.timezone))::int AS local_hour
+        FROM users u
+        LEFT JOIN user_preferences p
+            ON p.user_id = u.id AND p.preference_key = 'timezone'
+        LEFT JOIN zones pref_zone ON pref_zone.name = p.preference_value #>> '{}'
+        LEFT JOIN zones user_zone ON user_zone.name = u.timezone
+        CROSS JOIN LATERAL (
+            SELECT COALESCE(pref_zone.name, user_zone.name, 'UTC') AS timezone
+        ) tz
+        WHERE u.is_active = true 
+        AND u.phone_number IS NOT NULL
+        AND u.id > :after_id
+    ) recipients
+    WHERE local_hour = ANY(:local_hours)
+    ORDER BY id
+    LIMIT :page_size
+""")
+_BULK_EVENTS_BETWEEN_SQL = text("""
+    SELECT user_id, id, title, start_time, end_time, location
+    FROM calendar_events 
+    WHERE user_id = ANY(:user_ids) 
+    AND start_time >= :start_time 
+    AND start_time <= :end_time
+    ORDER BY user_id, start_time
+""")
+_BULK_UNREAD_COUNTS_SQL = text("""
+    SELECT user_id, COUNT(*) as count
+    FROM email_messages 
+    WHERE user_id = ANY(:user_ids) AND is_read = false
+    GROUP BY user_id
+""")
+_BULK_PENDING_REMINDERS_SQL = text("""
+    SELECT user_id, id, title, reminder_time, total
+    FROM (
+        SELECT user_id, id, title, reminder_time,
+               ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY reminder_time) AS rn,
+               COUNT(*) OVER (PARTITION BY user_id) AS total
+        FROM reminders 
+        WHERE user_id = ANY(:user_ids) 
+        AND is_completed = false 
+        AND reminder_time >= :now
+    ) ranked
+    WHERE rn <= 5
+    ORDER BY user_id, reminder_time
+""")
+_EVENTS_BETWEEN_SQL = text("""
+    SELECT id, title, start_time, end_time, location
+    FROM calendar_events 
+    WHERE user_id = :user_id 
+    AND start_time >= :start_time 
+    AND start_time <= :end_time
+    ORDER BY start_time
+""")
+_UNREAD_COUNT_SQL = text("""
+    SELECT COUNT(*) as count
+    FROM email_messages 
+    WHERE user_id = :user_id AND is_read = false
+""")
+_PENDING_REMINDERS_SQL = text("""
+    SELECT id, title, reminder_time, COUNT(*) OVER () AS total
+    FROM reminders 
+    WHERE user_id = :user_id 
+    AND is_completed = false 
+    AND reminder_time >= :now
+    ORDER BY reminder_time
+    LIMIT 5
+""")
+_USER_TIMEZONE_SQL = text("""
+    SELECT preference_value 
+    FROM user_preferences 
+    WHERE user_id = :user_id AND preference_key = 'timezone'
+""")
+
+# Today's completions and tomorrow's pending reminders in one scan; completed rows
+# rank by updated_at DESC, pending rows (NULL first key) by reminder_time
+_EVENING_REMINDERS_TEMPLATE = """
+    SELECT user_id, id, title, reminder_time, updated_at, is_completed
+    FROM (
+        SELECT user_id, id, title, reminder_time, updated_at, is_completed,
+               ROW_NUMBER() OVER (
+                   PARTITION BY user_id, is_completed
+                   ORDER BY CASE WHEN is_completed THEN updated_at END DESC, reminder_time
+               ) AS rn
+        FROM reminders 
+        WHERE {user_filter}
+        AND (
+            (is_completed = true AND updated_at >= :today_start AND updated_at <= :today_end)
+            OR (is_completed = false AND reminder_time >= :tomorrow_start AND reminder_time <= :tomorrow_end)
+        )
+    ) ranked
+    WHERE rn <= 5
+    ORDER BY user_id, rn
+"""
+_BULK_EVENING_REMINDERS_SQL = text(_EVENING_REMINDERS_TEMPLATE.format(user_filter="user_id = ANY(:user_ids)"))
+_EVENING_REMINDERS_SQL = text(_EVENING_REMINDERS_TEMPLATE.format(user_filter="user_id = :user_id"))
+_USER_PHONE_SQL = text("SELECT phone_number FROM users WHERE id = :user_id")
+
+
+class _TokenBucket:
+    """Async token bucket: allows bursts up to capacity, refilled at rate per second"""
+    
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self._tokens = self.capacity
+        self._updated_at = None  # Loop time of the last refill
+        self._lock = asyncio.Lock()
+    
+    async def acquire(self):
+        """Wait until a token is available and take it"""
+        async with self._lock:
+            loop = asyncio.get_running_loop()
+            while True:
+                now = loop.time()
+                if self._updated_at is not None:
+                    self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+                self._updated_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+    
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        return False
+
+
+def _is_local_digest_hour(timezone_name: Optional[str], digest_hour: int) -> bool:
+    """Whether it is digest_hour in the given timezone; unset or unknown zones count as UTC, as in the recipients query"""
+    try:
+        zone = ZoneInfo(timezone_name or 'UTC')
+    except (ZoneInfoNotFoundError, ValueError):
+        zone = ZoneInfo('UTC')
+    return datetime.now(zone).hour == digest_hour
+
 
 class DigestService:
     """Service for generating and sending morning/evening digests"""
     
     def __init__(self):
         self.scheduler = AsyncIOScheduler(
-            jobstores={'default': MemoryJobStore()},
+            jobstores={
+                'default': SQLAlchemyJobStore(
+                    url=settings.DATABASE_URL,
+                    engine_options={'pool_pre_ping': True, 'pool_recycle': 300}
+                )
+            },
             timezone='UTC'
         )
         self.logger = get_logger(__name__)
+        self._user_lookup_cache = {}  # user_id -> ((timezone, phone), fetched_at)
+        self._digest_cache = {}  # (user_id, digest_type, minute) -> content
+        self._pending_logs = set()  # In-flight digest_sent memory writes
+        self._sms_limiter = _TokenBucket(DIGEST_SMS_RATE_PER_SEC)
         self._setup_scheduler()
     
     def _setup_scheduler(self):
         """Setup the scheduler with default digest times"""
         try:
-            # Morning digest at 7 AM UTC (will be adjusted per user timezone)
-            self.scheduler.add_job(
-                self._send_morning_digests,
-                CronTrigger(hour=7, minute=0),
-                id='morning_digests',
-                name='Send morning digests to all users'
-            )
-            
-            # Evening digest at 7 PM UTC (will be adjusted per user timezone)
+            # One hourly tick covers every timezone; each run only selects users
+            # for whom it is now the morning or evening digest hour locally.
+            # Persistent jobs are stored by textual reference, so point it at a
+            # module-level entry point rather than a bound method
             self.scheduler.add_job(
-                self._send_evening_digests,
-                CronTrigger(hour=19, minute=0),
-                id='evening_digests',
-                name='Send evening digests to all users'
+                'services.digest_service:run_scheduled_digests',
+                CronTrigger(minute=0),
+                id='digest_tick',
+                name='Send morning/evening digests to users at their local digest hour',
+                replace_existing=True
             )
             
             self.logger.info("Digest scheduler configured")
@@ -76,462 +258,574 @@ class DigestService:
         except Exception as e:
             self.logger.error(f"Error stopping digest scheduler: {e}")
     
-    async def _send_morning_digests(self):
-        """Send morning digests to all active users"""
+    async def _send_scheduled_digests(self):
+        """Send the morning or evening digest to every user whose local hour calls for one"""
         try:
-            self.logger.info("Starting morning digest distribution")
+            self.logger.info("Starting scheduled digest distribution")
             
-            # Get all active users
-            users = await self._get_active_users()
+            morning_sent, evening_sent = await self._run_digest_pages()
             
-            for user in users:
-                try:
-                    await self._send_morning_digest(user['id'])
-                    # Small delay to avoid overwhelming the system
-                    await asyncio.sleep(1)
-                except Exception as e:
-                    self.logger.error(f"Error sending morning digest to user {user['id']}: {e}")
-            
-            self.logger.info(f"Morning digests sent to {len(users)} users")
+            self.logger.info(f"Digests sent: {morning_sent} morning, {evening_sent} evening")
             
         except Exception as e:
-            self.logger.error(f"Error in morning digest distribution: {e}")
+            self.logger.error(f"Error in scheduled digest distribution: {e}")
     
-    async def _send_evening_digests(self):
-        """Send evening digests to all active users"""
+    async def _run_digest_pages(self) -> Tuple[int, int]:
+        """Load, prefetch and dispatch due users one keyset page at a time"""
+        after_id = 0
+        morning_sent = evening_sent = 0
+        while True:
+            # Each page gets its own short session, released before the sends
+            async with db_session() as db:
+                users = await self._get_active_users(db, after_id)
+                morning_users = [user for user in users if user['local_hour'] == MORNING_DIGEST_HOUR]
+                evening_users = [user for user in users if user['local_hour'] == EVENING_DIGEST_HOUR]
+                morning_data = await self._prefetch_morning_data(db, morning_users)
+                evening_data = await self._prefetch_evening_data(db, evening_users)
+            
+            if not users:
+                return morning_sent, evening_sent
+            
+            await asyncio.gather(
+                self._dispatch_digests(morning_users, self._send_morning_digest, morning_data),
+                self._dispatch_digests(evening_users, self._send_evening_digest, evening_data)
+            )
+            morning_sent += len(morning_users)
+            evening_sent += len(evening_users)
+            if len(users) < DIGEST_USER_PAGE_SIZE:
+                return morning_sent, evening_sent
+            after_id = users[-1]['id']
+    
+    async def _dispatch_digests(
+        self,
+        users: List[Dict[str, Any]],
+        send_digest,
+        prefetched: Dict[int, Dict[str, Any]]
+    ):
+        """Send digests to users concurrently, bounded by DIGEST_CONCURRENCY"""
+        semaphore = asyncio.Semaphore(DIGEST_CONCURRENCY)
+        
+        async def _dispatch(user: Dict[str, Any]):
+            async with semaphore:
+                await send_digest(user['id'], prefetched.get(user['id']))
+        
+        # send_digest handles per-user failures itself; anything escaping it is
+        # unexpected, so let the group cancel the rest and report it once
         try:
-            self.logger.info("Starting evening digest distribution")
-            
-            # Get all active users
-            users = await self._get_active_users()
-            
-            for user in users:
-                try:
-                    await self._send_evening_digest(user['id'])
-                    # Small delay to avoid overwhelming the system
-                    await asyncio.sleep(1)
-                except Exception as e:
-                    self.logger.error(f"Error sending evening digest to user {user['id']}: {e}")
-            
-            self.logger.info(f"Evening digests sent to {len(users)} users")
-            
-        except Exception as e:
-            self.logger.error(f"Error in evening digest distribution: {e}")
+            async with asyncio.TaskGroup() as tg:
+                for user in users:
+                    tg.create_task(_dispatch(user))
+        except* Exception as eg:
+            self.logger.error(f"Error dispatching digests: {eg.exceptions}")
     
-    async def _get_active_users(self) -> List[Dict[str, Any]]:
-        """Get all active users from database"""
+    async def _get_active_users(self, db, after_id: int = 0) -> List[Dict[str, Any]]:
+        """Get the next page of active users whose local hour is a digest hour"""
         try:
-            db = await get_db()
-            
-            query = """
-                SELECT id, phone_number, name, timezone 
-                FROM users 
-                WHERE is_active = true 
-                AND phone_number IS NOT NULL
-            """
-            
-            result = await db.execute(query)
-            users = [dict(row) for row in result.fetchall()]
-            
-            return users
+            result = await db.execute(_DIGEST_RECIPIENTS_SQL, {
+                "local_hours": [MORNING_DIGEST_HOUR, EVENING_DIGEST_HOUR],
+                "after_id": after_id,
+                "page_size": DIGEST_USER_PAGE_SIZE
+            })
+            return result.mappings().all()
             
         except Exception as e:
             self.logger.error(f"Error getting active users: {e}")
             return []
     
-    async def _send_morning_digest(self, user_id: int):
+    async def _send_morning_digest(self, user_id: int, prefetched: Optional[Dict[str, Any]] = None):
         """Send morning digest to a specific user"""
         try:
-            # Get user's timezone preference
-            user_tz = await self._get_user_timezone(user_id)
-            if not user_tz:
-                user_tz = 'UTC'
-            
-            # Check if it's actually morning in user's timezone
-            user_time = datetime.now(pytz.timezone(user_tz))
-            if not (6 <= user_time.hour <= 9):  # Only send between 6-9 AM local time
-                self.logger.info(f"Not morning in {user_tz} for user {user_id}")
-                return
+            if prefetched is not None:
+                # Scheduled runs already selected this user by local hour in SQL
+                user_phone = prefetched['phone']
+            else:
+                # Get user's timezone preference and phone number
+                user_tz, user_phone = await self._get_user_contact(user_id)
+                
+                # Same rule as the scheduled tick: only at the morning digest hour local time
+                if not _is_local_digest_hour(user_tz, MORNING_DIGEST_HOUR):
+                    self.logger.info(f"Not the morning digest hour in {user_tz or 'UTC'} for user {user_id}")
+                    return
             
             # Generate morning digest content
-            digest_content = await self._generate_morning_digest(user_id)
+            digest_content = await self._generate_morning_digest(user_id, prefetched)
             
             # Send via SMS
-            user_phone = await self._get_user_phone(user_id)
             if user_phone:
                 try:
                     from telephony.telephony_manager import telephony_manager
-                    await telephony_manager.send_sms(
-                        to_phone=user_phone,
-                        message=digest_content
-                    )
+                    async with self._sms_limiter:
+                        await telephony_manager.send_sms(
+                            to_phone=user_phone,
+                            message=digest_content
+                        )
                 except ImportError:
                     # Fallback: just log that we would send SMS
                     self.logger.info(f"Would send SMS to {user_phone}: {digest_content[:100]}...")
                 
-                # Log the digest
-                await memory_manager.store_memory(
-                    user_id=user_id,
-                    memory_type="digest_sent",
-                    content=f"Morning digest sent: {digest_content[:100]}...",
-                    metadata={"digest_type": "morning", "sent_at": datetime.utcnow().isoformat()}
-                )
+                # Log the digest without holding up the next send
+                self._log_digest_sent(user_id, "morning", digest_content)
                 
                 self.logger.info(f"Morning digest sent to user {user_id}")
             
         except Exception as e:
             self.logger.error(f"Error sending morning digest to user {user_id}: {e}")
     
-    async def _send_evening_digest(self, user_id: int):
+    async def _send_evening_digest(self, user_id: int, prefetched: Optional[Dict[str, Any]] = None):
         """Send evening digest to a specific user"""
         try:
-            # Get user's timezone preference
-            user_tz = await self._get_user_timezone(user_id)
-            if not user_tz:
-                user_tz = 'UTC'
-            
-            # Check if it's actually evening in user's timezone
-            user_time = datetime.now(pytz.timezone(user_tz))
-            if not (18 <= user_time.hour <= 21):  # Only send between 6-9 PM local time
-                self.logger.info(f"Not evening in {user_tz} for user {user_id}")
-                return
+            if prefetched is not None:
+                # Scheduled runs already selected this user by local hour in SQL
+                user_phone = prefetched['phone']
+            else:
+                # Get user's timezone preference and phone number
+                user_tz, user_phone = await self._get_user_contact(user_id)
+                
+                # Same rule as the scheduled tick: only at the evening digest hour local time
+                if not _is_local_digest_hour(user_tz, EVENING_DIGEST_HOUR):
+                    self.logger.info(f"Not the evening digest hour in {user_tz or 'UTC'} for user {user_id}")
+                    return
             
             # Generate evening digest content
-            digest_content = await self._generate_evening_digest(user_id)
+            digest_content = await self._generate_evening_digest(user_id, prefetched)
             
             # Send via SMS
-            user_phone = await self._get_user_phone(user_id)
             if user_phone:
                 try:
                     from telephony.telephony_manager import telephony_manager
-                    await telephony_manager.send_sms(
-                        to_phone=user_phone,
-                        message=digest_content
-                    )
+                    async with self._sms_limiter:
+                        await telephony_manager.send_sms(
+                            to_phone=user_phone,
+                            message=digest_content
+                        )
                 except ImportError:
                     # Fallback: just log that we would send SMS
                     self.logger.info(f"Would send SMS to {user_phone}: {digest_content[:100]}...")
                 
-                # Log the digest
-                await memory_manager.store_memory(
-                    user_id=user_id,
-                    memory_type="digest_sent",
-                    content=f"Evening digest sent: {digest_content[:100]}...",
-                    metadata={"digest_type": "evening", "sent_at": datetime.utcnow().isoformat()}
-                )
+                # Log the digest without holding up the next send
+                self._log_digest_sent(user_id, "evening", digest_content)
                 
                 self.logger.info(f"Evening digest sent to user {user_id}")
             
         except Exception as e:
             self.logger.error(f"Error sending evening digest to user {user_id}: {e}")
     
-    async def _generate_morning_digest(self, user_id: int) -> str:
+    def _log_digest_sent(self, user_id: int, digest_type: str, digest_content: str):
+        """Record a sent digest in memory as a background task"""
+        task = asyncio.create_task(memory_manager.store_memory(
+            user_id=user_id,
+            memory_type="digest_sent",
+            content=f"{digest_type.capitalize()} digest sent: {digest_content[:100]}...",
+            metadata={"digest_type": digest_type, "sent_at": datetime.utcnow().isoformat()}
+        ))
+        # Hold a reference until done so the task isn't garbage collected mid-write
+        self._pending_logs.add(task)
+        task.add_done_callback(self._on_digest_logged)
+    
+    def _on_digest_logged(self, task: asyncio.Task):
+        """Drop a finished memory write and surface any failure"""
+        self._pending_logs.discard(task)
+        if not task.cancelled() and task.exception():
+            self.logger.error(f"Error logging digest: {task.exception()}")
+    
+    async def _generate_morning_digest(self, user_id: int, prefetched: Optional[Dict[str, Any]] = None) -> str:
         """Generate morning digest content for a user"""
+        cache_key = self._digest_cache_key(user_id, "morning")
+        cached = self._digest_cache.get(cache_key)
+        if cached:
+            return cached
+        
         try:
-            # Get today's calendar events
-            today_events = await self._get_today_events(user_id)
-            
-            # Get unread emails count
-            unread_emails = await self._get_unread_emails_count(user_id)
-            
-            # Get pending reminders
-            pending_reminders = await self._get_pending_reminders(user_id)
-            
-            # Get proactive suggestions (avoid circular import)
-            try:
-                from services.proactive_agent import proactive_agent
-                proactive_suggestions = await proactive_agent.suggest_proactive_actions(user_id)
-            except ImportError:
-                proactive_suggestions = []
+            if prefetched is not None:
+                today_events = prefetched['today_events']
+                unread_emails = prefetched['unread_emails']
+                pending_reminders = prefetched['pending_reminders']
+                proactive_suggestions = await self._get_proactive_suggestions(user_id)
+            else:
+                # Events, unread count, reminders and suggestions are independent
+                today_events, unread_emails, pending_reminders, proactive_suggestions = await asyncio.gather(
+                    self._fetch_with_session(self._get_today_events, user_id),
+                    self._fetch_with_session(self._get_unread_emails_count, user_id),
+                    self._fetch_with_session(self._get_pending_reminders, user_id),
+                    self._get_proactive_suggestions(user_id)
+                )
             
             # Build digest content
-            digest_parts = []
-            
-            # Greeting
-            digest_parts.append("🌅 Good morning! Here's your daily digest:")
+            digest_parts = [MORNING_GREETING]
             
             # Calendar events
             if today_events:
                 digest_parts.append(f"📅 Today: {len(today_events)} events")
-                for i, event in enumerate(today_events[:3], 1):  # Show first 3
-                    time_str = self._format_event_time(event['start_time'])
-                    digest_parts.append(f"{i}. {time_str} - {event['title']}")
+                digest_parts.append(self._event_lines(today_events))
                 if len(today_events) > 3:
                     digest_parts.append(f"... and {len(today_events) - 3} more")
             else:
-                digest_parts.append("📅 Today: No events scheduled")
+                digest_parts.append(MORNING_NO_EVENTS)
             
             # Email summary
-            if unread_emails > 0:
-                digest_parts.append(f"📧 {unread_emails} unread emails")
-            else:
-                digest_parts.append("📧 Inbox is clean!")
+            digest_parts.append(f"📧 {unread_emails} unread emails" if unread_emails > 0 else MORNING_INBOX_CLEAN)
             
             # Reminders
             if pending_reminders:
-                digest_parts.append(f"⏰ {len(pending_reminders)} pending reminders")
-                for i, reminder in enumerate(pending_reminders[:2], 1):  # Show first 2
-                    digest_parts.append(f"{i}. {reminder['title']}")
+                # Rows carry the full pending count alongside the first 5
+                reminder_total = pending_reminders[0].get('total', len(pending_reminders))
+                digest_parts.append(f"⏰ {reminder_total} pending reminders")
+                digest_parts.append(self._title_lines(pending_reminders))
             
             # Proactive suggestions
             if proactive_suggestions:
-                digest_parts.append("💡 Suggestions:")
-                for i, suggestion in enumerate(proactive_suggestions[:2], 1):
-                    digest_parts.append(f"{i}. {suggestion['action']}")
-            
-            # Weather and commute (placeholder for future integration)
-            digest_parts.append("🌤️ Weather: Check your weather app for today's forecast")
+                digest_parts.append(MORNING_SUGGESTIONS_HEADER)
+                digest_parts.append("\n".join(
+                    f"{i}. {suggestion['action']}" for i, suggestion in enumerate(proactive_suggestions[:2], 1)
+                ))
             
-            # Sign off
-            digest_parts.append("Have a great day! Reply with any questions.")
+            # Weather (placeholder for future integration) and sign off
+            digest_parts.append(MORNING_FOOTER)
             
-            return "\n".join(digest_parts)
+            content = "\n".join(digest_parts)
+            self._store_digest(cache_key, content)
+            return content
             
         except Exception as e:
             self.logger.error(f"Error generating morning digest for user {user_id}: {e}")
             return "🌅 Good morning! I'm having trouble loading your digest right now. Reply with any questions!"
     
-    async def _generate_evening_digest(self, user_id: int) -> str:
+    def _digest_cache_key(self, user_id: int, digest_type: str) -> Tuple[int, str, datetime]:
+        """Cache key that rolls over every minute, bounding reuse to the same minute"""
+        return (user_id, digest_type, datetime.utcnow().replace(second=0, microsecond=0))
+    
+    def _store_digest(self, cache_key: Tuple[int, str, datetime], content: str):
+        """Remember a generated digest body, evicting the oldest entry when full"""
+        if len(self._digest_cache) >= DIGEST_CONTENT_CACHE_SIZE:
+            self._digest_cache.pop(next(iter(self._digest_cache)))
+        self._digest_cache[cache_key] = content
+    
+    async def _fetch_with_session(self, fetch, user_id: int):
+        """Run one per-user fetch on its own session so fetches can overlap"""
+        async with db_session() as db:
+            return await fetch(db, user_id)
+    
+    async def _get_proactive_suggestions(self, user_id: int) -> List[Dict[str, Any]]:
+        """Get proactive suggestions for a user"""
+        # Imported here to avoid a circular import
+        try:
+            from services.proactive_agent import proactive_agent
+        except ImportError:
+            return []
+        
+        return await proactive_agent.suggest_proactive_actions(user_id)
+    
+    async def _generate_evening_digest(self, user_id: int, prefetched: Optional[Dict[str, Any]] = None) -> str:
         """Generate evening digest content for a user"""
+        cache_key = self._digest_cache_key(user_id, "evening")
+        cached = self._digest_cache.get(cache_key)
+        if cached:
+            return cached
+        
         try:
-            # Get tomorrow's calendar events
-            tomorrow_events = await self._get_tomorrow_events(user_id)
-            
-            # Get today's completed tasks
-            completed_tasks = await self._get_completed_tasks_today(user_id)
-            
-            # Get pending items for tomorrow
-            pending_tomorrow = await self._get_pending_tomorrow(user_id)
+            if prefetched is not None:
+                tomorrow_events = prefetched['tomorrow_events']
+                completed_tasks = prefetched['completed_tasks']
+                pending_tomorrow = prefetched['pending_tomorrow']
+            else:
+                # Tomorrow's events and the evening reminder buckets are independent
+                tomorrow_events, (completed_tasks, pending_tomorrow) = await asyncio.gather(
+                    self._fetch_with_session(self._get_tomorrow_events, user_id),
+                    self._fetch_with_session(self._get_evening_reminders, user_id)
+                )
             
             # Build digest content
-            digest_parts = []
-            
-            # Greeting
-            digest_parts.append("🌙 Good evening! Here's your wrap-up:")
+            digest_parts = [EVENING_GREETING]
             
             # Tomorrow's schedule
             if tomorrow_events:
                 digest_parts.append(f"📅 Tomorrow: {len(tomorrow_events)} events")
-                for i, event in enumerate(tomorrow_events[:3], 1):
-                    time_str = self._format_event_time(event['start_time'])
-                    digest_parts.append(f"{i}. {time_str} - {event['title']}")
+                digest_parts.append(self._event_lines(tomorrow_events))
             else:
-                digest_parts.append("📅 Tomorrow: No events scheduled")
+                digest_parts.append(EVENING_NO_EVENTS)
             
             # Today's accomplishments
             if completed_tasks:
                 digest_parts.append(f"✅ Completed today: {len(completed_tasks)} tasks")
-                for i, task in enumerate(completed_tasks[:2], 1):
-                    digest_parts.append(f"{i}. {task['title']}")
+                digest_parts.append(self._title_lines(completed_tasks))
             
             # Tomorrow's preparation
             if pending_tomorrow:
                 digest_parts.append(f"📋 Prepare for tomorrow: {len(pending_tomorrow)} items")
-                for i, item in enumerate(pending_tomorrow[:2], 1):
-                    digest_parts.append(f"{i}. {item['title']}")
+                digest_parts.append(self._title_lines(pending_tomorrow))
             
-            # Evening routine suggestions
-            digest_parts.append("🌙 Evening routine:")
-            digest_parts.append("1. Review tomorrow's schedule")
-            digest_parts.append("2. Set out clothes/items needed")
-            digest_parts.append("3. Wind down and relax")
+            # Evening routine suggestions and sign off
+            digest_parts.append(EVENING_FOOTER)
             
-            # Sign off
-            digest_parts.append("Sleep well! I'll see you in the morning.")
-            
-            return "\n".join(digest_parts)
+            content = "\n".join(digest_parts)
+            self._store_digest(cache_key, content)
+            return content
             
         except Exception as e:
             self.logger.error(f"Error generating evening digest for user {user_id}: {e}")
             return "🌙 Good evening! I'm having trouble loading your wrap-up right now. Have a good night!"
     
-    async def _get_today_events(self, user_id: int) -> List[Dict[str, Any]]:
-        """Get today's calendar events for a user"""
+    async def _prefetch_morning_data(self, db, users: List[Dict[str, Any]]) -> Dict[int, Dict[str, Any]]:
+        """Load morning digest inputs for many users with one query per data type"""
+        user_ids = [user['id'] for user in users]
+        if not user_ids:
+            return {}
+        
+        today_events = await self._bulk_today_events(db, user_ids)
+        unread_counts = await self._bulk_unread_emails_counts(db, user_ids)
+        pending_reminders = await self._bulk_pending_reminders(db, user_ids)
+        
+        return {
+            user['id']: {
+                'phone': user.get('phone_number'),
+                'today_events': today_events.get(user['id'], []),
+                'unread_emails': unread_counts.get(user['id'], 0),
+                'pending_reminders': pending_reminders.get(user['id'], [])
+            }
+            for user in users
+        }
+    
+    async def _prefetch_evening_data(self, db, users: List[Dict[str, Any]]) -> Dict[int, Dict[str, Any]]:
+        """Load evening digest inputs for many users with one query per data type"""
+        user_ids = [user['id'] for user in users]
+        if not user_ids:
+            return {}
+        
+        tomorrow_events = await self._bulk_tomorrow_events(db, user_ids)
+        completed_tasks, pending_tomorrow = await self._bulk_evening_reminders(db, user_ids)
+        
+        return {
+            user['id']: {
+                'phone': user.get('phone_number'),
+                'tomorrow_events': tomorrow_events.get(user['id'], []),
+                'completed_tasks': completed_tasks.get(user['id'], []),
+                'pending_tomorrow': pending_tomorrow.get(user['id'], [])
+            }
+            for user in users
+        }
+    
+    def _group_by_user(self, result) -> Dict[int, List[Dict[str, Any]]]:
+        """Bucket result rows by their user_id column, preserving row order"""
+        # Row mappings share one key view per result, unlike a dict per row
+        grouped = defaultdict(list)
+        for row in result.mappings():
+            grouped[row['user_id']].append(row)
+        return grouped
+    
+    async def _bulk_events_between(
+        self,
+        db,
+        user_ids: List[int],
+        start_time: datetime,
+        end_time: datetime
+    ) -> Dict[int, List[Dict[str, Any]]]:
+        """Get calendar events in a time window for many users"""
+        result = await db.execute(_BULK_EVENTS_BETWEEN_SQL, {
+            "user_ids": user_ids,
+            "start_time": start_time,
+            "end_time": end_time
+        })
+        
+        return self._group_by_user(result)
+    
+    async def _bulk_today_events(self, db, user_ids: List[int]) -> Dict[int, List[Dict[str, Any]]]:
+        """Get today's calendar events for many users"""
         try:
-            db = await get_db()
+            today = datetime.utcnow().date()
+            return await self._bulk_events_between(
+                db,
+                user_ids,
+                datetime.combine(today, time.min),
+                datetime.combine(today, time.max)
+            )
             
+        except Exception as e:
+            self.logger.error(f"Error getting today's events: {e}")
+            return {}
+    
+    async def _bulk_tomorrow_events(self, db, user_ids: List[int]) -> Dict[int, List[Dict[str, Any]]]:
+        """Get tomorrow's calendar events for many users"""
+        try:
+            tomorrow = (datetime.utcnow() + timedelta(days=1)).date()
+            return await self._bulk_events_between(
+                db,
+                user_ids,
+                datetime.combine(tomorrow, time.min),
+                datetime.combine(tomorrow, time.max)
+            )
+            
+        except Exception as e:
+            self.logger.error(f"Error getting tomorrow's events: {e}")
+            return {}
+    
+    async def _bulk_unread_emails_counts(self, db, user_ids: List[int]) -> Dict[int, int]:
+        """Get unread email counts for many users"""
+        try:
+            result = await db.execute(_BULK_UNREAD_COUNTS_SQL, {"user_ids": user_ids})
+            
+            return {row.user_id: row.count for row in result.fetchall()}
+            
+        except Exception as e:
+            self.logger.error(f"Error getting unread emails counts: {e}")
+            return {}
+    
+    async def _bulk_pending_reminders(self, db, user_ids: List[int]) -> Dict[int, List[Dict[str, Any]]]:
+        """Get up to 5 upcoming reminders, each with the user's pending total, for many users"""
+        try:
+            result = await db.execute(_BULK_PENDING_REMINDERS_SQL, {
+                "user_ids": user_ids,
+                "now": datetime.utcnow()
+            })
+            
+            return self._group_by_user(result)
+            
+        except Exception as e:
+            self.logger.error(f"Error getting pending reminders: {e}")
+            return {}
+    
+    async def _bulk_evening_reminders(
+        self,
+        db,
+        user_ids: List[int]
+    ) -> Tuple[Dict[int, List[Dict[str, Any]]], Dict[int, List[Dict[str, Any]]]]:
+        """Get up to 5 tasks completed today and 5 items pending tomorrow for many users"""
+        try:
+            result = await db.execute(
+                _BULK_EVENING_REMINDERS_SQL,
+                {"user_ids": user_ids, **self._evening_reminder_window()}
+            )
+            
+            completed_tasks = defaultdict(list)
+            pending_tomorrow = defaultdict(list)
+            for row in result.mappings():
+                bucket = completed_tasks if row['is_completed'] else pending_tomorrow
+                bucket[row['user_id']].append(row)
+            
+            return completed_tasks, pending_tomorrow
+            
+        except Exception as e:
+            self.logger.error(f"Error getting evening reminders: {e}")
+            return {}, {}
+    
+    def _evening_reminder_window(self) -> Dict[str, datetime]:
+        """Query bounds for today's completions and tomorrow's pending reminders"""
+        today = datetime.utcnow().date()
+        tomorrow = today + timedelta(days=1)
+        return {
+            "today_start": datetime.combine(today, time.min),
+            "today_end": datetime.combine(today, time.max),
+            "tomorrow_start": datetime.combine(tomorrow, time.min),
+            "tomorrow_end": datetime.combine(tomorrow, time.max)
+        }
+    
+    async def _get_today_events(self, db, user_id: int) -> List[Dict[str, Any]]:
+        """Get today's calendar events for a user"""
+        try:
             today = datetime.utcnow().date()
             start_time = datetime.combine(today, time.min)
             end_time = datetime.combine(today, time.max)
             
-            query = """
-                SELECT id, title, start_time, end_time, location
-                FROM calendar_events 
-                WHERE user_id = :user_id 
-                AND start_time >= :start_time 
-                AND start_time <= :end_time
-                ORDER BY start_time
-            """
-            
-            result = await db.execute(query, {
+            result = await db.execute(_EVENTS_BETWEEN_SQL, {
                 "user_id": user_id,
                 "start_time": start_time,
                 "end_time": end_time
             })
             
-            events = [dict(row) for row in result.fetchall()]
-            return events
+            return result.mappings().all()
             
         except Exception as e:
             self.logger.error(f"Error getting today's events: {e}")
             return []
     
-    async def _get_tomorrow_events(self, user_id: int) -> List[Dict[str, Any]]:
+    async def _get_tomorrow_events(self, db, user_id: int) -> List[Dict[str, Any]]:
         """Get tomorrow's calendar events for a user"""
         try:
-            db = await get_db()
-            
             tomorrow = (datetime.utcnow() + timedelta(days=1)).date()
             start_time = datetime.combine(tomorrow, time.min)
             end_time = datetime.combine(tomorrow, time.max)
             
-            query = """
-                SELECT id, title, start_time, end_time, location
-                FROM calendar_events 
-                WHERE user_id = :user_id 
-                AND start_time >= :start_time 
-                AND start_time <= :end_time
-                ORDER BY start_time
-            """
-            
-            result = await db.execute(query, {
+            result = await db.execute(_EVENTS_BETWEEN_SQL, {
                 "user_id": user_id,
                 "start_time": start_time,
                 "end_time": end_time
             })
             
-            events = [dict(row) for row in result.fetchall()]
-            return events
+            return result.mappings().all()
             
         except Exception as e:
             self.logger.error(f"Error getting tomorrow's events: {e}")
             return []
     
-    async def _get_unread_emails_count(self, user_id: int) -> int:
+    async def _get_unread_emails_count(self, db, user_id: int) -> int:
         """Get count of unread emails for a user"""
         try:
-            db = await get_db()
-            
-            query = """
-                SELECT COUNT(*) as count
-                FROM email_messages 
-                WHERE user_id = :user_id AND is_read = false
-            """
-            
-            result = await db.execute(query, {"user_id": user_id})
-            row = result.fetchone()
-            
-            return row.count if row else 0
+            result = await db.execute(_UNREAD_COUNT_SQL, {"user_id": user_id})
+            return result.scalar() or 0
             
         except Exception as e:
             self.logger.error(f"Error getting unread emails count: {e}")
             return 0
     
-    async def _get_pending_reminders(self, user_id: int) -> List[Dict[str, Any]]:
-        """Get pending reminders for a user"""
+    async def _get_pending_reminders(self, db, user_id: int) -> List[Dict[str, Any]]:
+        """Get up to 5 pending reminders for a user, each row carrying the pending total"""
         try:
-            db = await get_db()
-            
-            query = """
-                SELECT id, title, reminder_time
-                FROM reminders 
-                WHERE user_id = :user_id 
-                AND is_completed = false 
-                AND reminder_time >= :now
-                ORDER BY reminder_time
-                LIMIT 5
-            """
-            
-            result = await db.execute(query, {
+            result = await db.execute(_PENDING_REMINDERS_SQL, {
                 "user_id": user_id,
                 "now": datetime.utcnow()
             })
             
-            reminders = [dict(row) for row in result.fetchall()]
-            return reminders
+            return result.mappings().all()
             
         except Exception as e:
             self.logger.error(f"Error getting pending reminders: {e}")
             return []
     
-    async def _get_completed_tasks_today(self, user_id: int) -> List[Dict[str, Any]]:
-        """Get tasks completed today by a user"""
+    async def _get_evening_reminders(
+        self,
+        db,
+        user_id: int
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Get tasks completed today and items pending for tomorrow in one query"""
         try:
-            db = await get_db()
-            
-            today = datetime.utcnow().date()
-            start_time = datetime.combine(today, time.min)
-            end_time = datetime.combine(today, time.max)
+            result = await db.execute(
+                _EVENING_REMINDERS_SQL,
+                {"user_id": user_id, **self._evening_reminder_window()}
+            )
             
-            query = """
-                SELECT id, title, updated_at
-                FROM reminders 
-                WHERE user_id = :user_id 
-                AND is_completed = true 
-                AND updated_at >= :start_time 
-                AND updated_at <= :end_time
-                ORDER BY updated_at DESC
-                LIMIT 5
-            """
-            
-            result = await db.execute(query, {
-                "user_id": user_id,
-                "start_time": start_time,
-                "end_time": end_time
-            })
+            completed_tasks, pending_tomorrow = [], []
+            for row in result.mappings():
+                (completed_tasks if row['is_completed'] else pending_tomorrow).append(row)
             
-            tasks = [dict(row) for row in result.fetchall()]
-            return tasks
+            return completed_tasks, pending_tomorrow
             
         except Exception as e:
-            self.logger.error(f"Error getting completed tasks: {e}")
-            return []
+            self.logger.error(f"Error getting evening reminders: {e}")
+            return [], []
     
-    async def _get_pending_tomorrow(self, user_id: int) -> List[Dict[str, Any]]:
-        """Get items pending for tomorrow"""
-        try:
-            db = await get_db()
-            
-            tomorrow = (datetime.utcnow() + timedelta(days=1)).date()
-            start_time = datetime.combine(tomorrow, time.min)
-            end_time = datetime.combine(tomorrow, time.max)
-            
-            query = """
-                SELECT id, title, reminder_time
-                FROM reminders 
-                WHERE user_id = :user_id 
-                AND is_completed = false 
-                AND reminder_time >= :start_time 
-                AND reminder_time <= :end_time
-                ORDER BY reminder_time
-                LIMIT 5
-            """
-            
-            result = await db.execute(query, {
-                "user_id": user_id,
-                "start_time": start_time,
-                "end_time": end_time
-            })
-            
-            items = [dict(row) for row in result.fetchall()]
-            return items
-            
-        except Exception as e:
-            self.logger.error(f"Error getting pending tomorrow: {e}")
-            return []
+    async def _get_user_contact(self, user_id: int) -> Tuple[str, Optional[str]]:
+        """Get a user's (timezone, phone), cached for USER_LOOKUP_CACHE_TTL seconds"""
+        cached = self._user_lookup_cache.get(user_id)
+        if cached:
+            contact, timestamp = cached
+            if (datetime.utcnow() - timestamp).total_seconds() < USER_LOOKUP_CACHE_TTL:
+                return contact
+        
+        async with db_session() as db:
+            user_tz = await self._get_user_timezone(db, user_id)
+            user_phone = await self._get_user_phone(db, user_id)
+        
+        # Only cache complete lookups so a transient DB error isn't remembered
+        if user_phone:
+            if len(self._user_lookup_cache) >= USER_LOOKUP_CACHE_SIZE:
+                self._user_lookup_cache.pop(next(iter(self._user_lookup_cache)))
+            self._user_lookup_cache[user_id] = ((user_tz, user_phone), datetime.utcnow())
+        
+        return user_tz, user_phone
     
-    async def _get_user_timezone(self, user_id: int) -> Optional[str]:
+    async def _get_user_timezone(self, db, user_id: int) -> Optional[str]:
         """Get user's timezone preference"""
         try:
-            db = await get_db()
-            
-            query = """
-                SELECT preference_value 
-                FROM user_preferences 
-                WHERE user_id = :user_id AND preference_key = 'timezone'
-            """
-            
-            result = await db.execute(query, {"user_id": user_id})
+            result = await db.execute(_USER_TIMEZONE_SQL, {"user_id": user_id})
             row = result.fetchone()
             
             if row and row.preference_value:
@@ -544,13 +838,10 @@ class DigestService:
             self.logger.error(f"Error getting user timezone: {e}")
             return 'UTC'
     
-    async def _get_user_phone(self, user_id: int) -> Optional[str]:
+    async def _get_user_phone(self, db, user_id: int) -> Optional[str]:
         """Get user's phone number"""
         try:
-            db = await get_db()
-            
-            query = "SELECT phone_number FROM users WHERE id = :user_id"
-            result = await db.execute(query, {"user_id": user_id})
+            result = await db.execute(_USER_PHONE_SQL, {"user_id": user_id})
             row = result.fetchone()
             
             return row.phone_number if row else None
@@ -559,15 +850,29 @@ class DigestService:
             self.logger.error(f"Error getting user phone: {e}")
             return None
     
+    def _event_lines(self, events: List[Dict[str, Any]]) -> str:
+        """Numbered "time - title" lines for the first three events"""
+        return "\n".join(
+            f"{i}. {self._format_event_time(event['start_time'])} - {event['title']}"
+            for i, event in enumerate(events[:3], 1)
+        )
+    
+    def _title_lines(self, items: List[Dict[str, Any]]) -> str:
+        """Numbered title lines for the first two items"""
+        return "\n".join(f"{i}. {item['title']}" for i, item in enumerate(items[:2], 1))
+    
     def _format_event_time(self, start_time_str: str) -> str:
         """Format event start time for display"""
         try:
             if isinstance(start_time_str, str):
-                dt = datetime.fromisoformat(start_time_str.replace('Z', '+00:00'))
+                # Python 3.11+ parses a trailing 'Z' natively
+                dt = datetime.fromisoformat(start_time_str)
             else:
                 dt = start_time_str
             
-            return dt.strftime("%I:%M %p")
+            # Same output as strftime("%I:%M %p") without the format parser
+            hour = dt.hour
+            return f"{hour % 12 or 12:02d}:{dt.minute:02d} {'AM' if hour < 12 else 'PM'}"
             
         except Exception as e:
             self.logger.error(f"Error formatting event time: {e}")
@@ -584,14 +889,15 @@ class DigestService:
                 return {"error": "Invalid digest type. Use 'morning' or 'evening'"}
             
             # Send via SMS
-            user_phone = await self._get_user_phone(user_id)
+            _, user_phone = await self._get_user_contact(user_id)
             if user_phone:
                 try:
                     from telephony.telephony_manager import telephony_manager
-                    await telephony_manager.send_sms(
-                        to_phone=user_phone,
-                        message=content
-                    )
+                    async with self._sms_limiter:
+                        await telephony_manager.send_sms(
+                            to_phone=user_phone,
+                            message=content
+                        )
                 except ImportError:
                     # Fallback: just log that we would send SMS
                     self.logger.info(f"Would send SMS to {user_phone}: {content[:100]}...")
@@ -612,3 +918,8 @@ class DigestService:
 
 # Global instance
 digest_service = DigestService()
+
+
+async def run_scheduled_digests():
+    """Scheduler entry point for the hourly digest tick"""
+    await digest_service._send_scheduled_digests()
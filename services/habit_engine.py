@@ -4,40 +4,163 @@ Pluto Habit Learning Engine
 Detects user patterns and suggests proactive actions with enhanced memory integration
 """
 
+import asyncio
+import copy
+import heapq
 import json
 import logging
 import re
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+from enum import StrEnum
+from functools import cache, lru_cache
+from operator import attrgetter
+from types import MappingProxyType
 from typing import List, Dict, Any, Optional
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, func, desc
-from collections import defaultdict
+from sqlalchemy import and_, func, desc, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from collections import Counter, defaultdict
+import numpy as np
 
-from db.database import get_db
+from db.database import db_session
 from db.models import UserMemory, UserHabit, ProactiveTask
 from services.memory_manager import memory_manager
 from utils.logging_config import get_logger
-from utils.constants import HABIT_CONFIDENCE_THRESHOLD
+from utils.constants import (
+    HABIT_CONFIDENCE_THRESHOLD, HABIT_ANALYSIS_CACHE_TTL, HABIT_LIST_CACHE_TTL,
+    HABIT_MEMORY_BATCH_SIZE, HABIT_MEMORY_FLUSH_INTERVAL
+)
 
 logger = get_logger(__name__)
 
+
+def _naive_utc(value: datetime) -> datetime:
+    """Normalize a possibly timezone-aware DB timestamp to naive UTC for utcnow() math"""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _datetime64_array(values: List[Optional[datetime]]) -> np.ndarray:
+    """Pack DB timestamps into a naive-UTC datetime64 array, with NaT for missing values"""
+    return np.array(
+        [_naive_utc(value) if value else None for value in values],
+        dtype="datetime64[us]"
+    )
+
+
+def _habit_timing_masks(
+    hours_until: np.ndarray,
+    hours_since: np.ndarray,
+    expected_frequency: np.ndarray,
+    has_prediction: np.ndarray
+):
+    """
+    Select habits worth a suggestion from parallel per-habit float arrays
+    
+    Returns:
+        (due within 4 hours, unpredicted and overdue by 1.5x their expected frequency)
+    """
+    due_soon = has_prediction & (hours_until >= 0) & (hours_until <= 4)
+    missed = ~has_prediction & (hours_since > expected_frequency * 1.5)
+    return due_soon, missed
+
+
+# Explicit clock times in memory content: "7:30 pm", "0730", "7 am", "7 o'clock"
+_TIME_RE = re.compile(
+    r"(?P<h1>\d{1,2}):?(?P<m1>\d{2})\s*(?P<ap1>am|pm)?"
+    r"|(?P<h2>\d{1,2})\s*(?P<ap2>am|pm)"
+    r"|(?P<h3>\d{1,2})\s*o'?clock",
+    re.IGNORECASE
+)
+_AMPM_RE = re.compile(r"\b(am|pm)\b", re.IGNORECASE)
+
+# Relative times of day and the clock time each stands for
+_RELATIVE_TIMES = {
+    "morning": (8, 0),
+    "afternoon": (14, 0),
+    "evening": (18, 0),
+    "night": (22, 0)
+}
+_RELATIVE_TIME_RE = re.compile("|".join(_RELATIVE_TIMES))
+
+# Habit pattern types, one per detector
+_PATTERN_TYPES = ("time_based", "frequency_based", "context_based", "sequence_based")
+
+# Memory types grouped by the kind of habit they indicate
+_HABIT_CATEGORIES = MappingProxyType({
+    "communication": ("sms", "email", "call"),
+    "productivity": ("reminder", "calendar", "note"),
+    "lifestyle": ("wake_up", "exercise", "meal", "sleep"),
+    "work": ("meeting", "task", "deadline", "break")
+})
+
+# UserHabit columns serialized by _habit_to_dict, read in one C-level call
+_HABIT_FIELDS = attrgetter(
+    "id", "pattern_type", "pattern_data", "confidence",
+    "observation_count", "proactive_suggestions"
+)
+
+# Memory types whose content is scanned for clock times
+_TIME_PATTERN_TYPES = frozenset({"reminder", "schedule", "habit", "sms"})
+
+
+class SuggestionPriority(StrEnum):
+    """Suggestion priority; members are their string labels on the wire"""
+    HIGH = "high"
+    MEDIUM = "medium"
+    LOW = "low"
+
+
+# Suggestion priorities ranked numerically; the labels don't sort in priority order
+_PRIORITY_RANK = {
+    SuggestionPriority.HIGH: 3,
+    SuggestionPriority.MEDIUM: 2,
+    SuggestionPriority.LOW: 1
+}
+
+
+def _suggestion_rank(suggestion: Dict[str, Any]):
+    """Sort key ordering suggestions by priority, then confidence"""
+    return (_PRIORITY_RANK.get(suggestion.get('priority', SuggestionPriority.MEDIUM), 2), suggestion.get('confidence') or 0)
+
+
+# Missed-habit suggestion with its constant fields set; copied and filled per habit
+_MISSED_HABIT_SUGGESTION = {
+    'type': 'missed_habit',
+    'priority': SuggestionPriority.MEDIUM,
+    'message': None,
+    'action': 'execute_habit',
+    'habit_id': None,
+    'confidence': None,
+    'hours_since': None
+}
+
+
+@lru_cache(maxsize=1024)
+def _missed_habit_template(action: str) -> str:
+    """Missed-habit message for an action, built once and left open for the hours"""
+    return f"You missed your {action.replace('%', '%%')} (%d hours ago). Want to do it now?"
+
+
+# Consecutive memories further apart than this aren't treated as trigger/action pairs
+_CONTEXT_MAX_GAP_MINUTES = 120
+
+
 class HabitEngine:
     """Pluto's habit learning engine - learns patterns and suggests proactive actions"""
     
+    # Shared, read-only across instances
+    pattern_types = _PATTERN_TYPES
+    habit_categories = _HABIT_CATEGORIES
+    
     def __init__(self):
-        self.pattern_detectors = {
-            "time_based": self._detect_time_patterns,
-            "frequency_based": self._detect_frequency_patterns,
-            "context_based": self._detect_context_patterns,
-            "sequence_based": self._detect_sequence_patterns
-        }
-        
-        self.habit_categories = {
-            "communication": ["sms", "email", "call"],
-            "productivity": ["reminder", "calendar", "note"],
-            "lifestyle": ["wake_up", "exercise", "meal", "sleep"],
-            "work": ["meeting", "task", "deadline", "break"]
-        }
+        self._analysis_cache = {}  # user_id -> (memory fingerprint, habits, analyzed_at)
+        self._habits_cache = {}  # user_id -> (habit dicts, fetched_at)
+        self._habits_json_cache = {}  # user_id -> (habit dicts, JSON encoding of them)
+        self._pending_writes = set()  # In-flight habit persistence tasks
+        self._memory_queue = None  # Habit execution memories awaiting a batched write
+        self._memory_flusher = None  # Background task draining _memory_queue
     
     async def analyze_user_habits(self, user_id: str) -> List[Dict[str, Any]]:
         """
@@ -50,8 +173,8 @@ class HabitEngine:
             List of detected habits
         """
         try:
-            # Get recent memories (last 30 days)
-            memories = await memory_manager.recall_memory(
+            # Get recent memories (last 30 days) as (type, content, timestamp, id) rows
+            memories = await memory_manager.recall_memory_projection(
                 user_id=user_id,
                 hours_back=24 * 30,
                 limit=1000
@@ -60,55 +183,118 @@ class HabitEngine:
             if not memories:
                 return []
             
+            # Memories come newest first; the latest timestamp, count and highest id identify
+            # the input, so a forget plus a same-timestamp insert still changes it
+            fingerprint = (memories[0][2], len(memories), max(memory[3] for memory in memories))
+            cached = self._analysis_cache.get(user_id)
+            if cached:
+                cached_fingerprint, cached_habits, analyzed_at = cached
+                if (cached_fingerprint == fingerprint
+                        and (datetime.utcnow() - analyzed_at).total_seconds() < HABIT_ANALYSIS_CACHE_TTL):
+                    # Callers get their own copy so edits can't leak into the cache
+                    return copy.deepcopy(cached_habits)
+            
+            # One walk over the memories, oldest first, feeds all four detectors
+            time_buckets, frequency_buckets, types, timestamps = self._scan_memories(reversed(memories))
+            
             # Detect different types of patterns
             habits = []
             
             # Time-based patterns
-            time_habits = await self._detect_time_patterns(user_id, memories)
+            time_habits = self._detect_time_patterns(user_id, time_buckets)
             habits.extend(time_habits)
             
             # Frequency-based patterns
-            freq_habits = await self._detect_frequency_patterns(user_id, memories)
+            freq_habits = self._detect_frequency_patterns(user_id, frequency_buckets)
             habits.extend(freq_habits)
             
             # Context-based patterns
-            context_habits = await self._detect_context_patterns(user_id, memories)
+            context_habits = self._detect_context_patterns(user_id, types, timestamps)
             habits.extend(context_habits)
             
             # Sequence-based patterns
-            sequence_habits = await self._detect_sequence_patterns(user_id, memories)
+            sequence_habits = self._detect_sequence_patterns(user_id, types, timestamps)
             habits.extend(sequence_habits)
             
-            # Store detected habits
-            await self._store_habits(user_id, habits)
+            self._analysis_cache[user_id] = (fingerprint, habits, datetime.utcnow())
             
-            # Update habit predictions
-            await self._update_habit_predictions(user_id, habits)
+            # Persist in the background; callers only need the detected habits
+            task = asyncio.create_task(self._persist_habits(user_id, habits))
+            # Hold a reference until done so the task isn't garbage collected mid-write
+            self._pending_writes.add(task)
+            task.add_done_callback(self._pending_writes.discard)
             
-            return habits
+            return copy.deepcopy(habits)
             
         except Exception as e:
             logger.error(f"Error analyzing user habits: {e}")
             return []
     
-    async def get_user_habits(self, user_id: str) -> List[Dict[str, Any]]:
-        """Get user's current habits"""
+    async def _persist_habits(self, user_id: str, habits: List[Dict[str, Any]]):
+        """Store detected habits and their predictions in one transaction"""
         try:
-            db = await anext(get_db())
+            async with db_session() as db:
+                habit_rows = await self._store_habits(db, user_id, habits)
+                await self._update_habit_predictions(db, habit_rows)
             
-            habits = db.query(UserHabit).filter(
-                and_(
-                    UserHabit.user_id == user_id,
-                    UserHabit.is_active == True
-                )
-            ).order_by(desc(UserHabit.confidence)).all()
+            # Stored habits changed; the next read goes to the database
+            self._habits_cache.pop(user_id, None)
+            
+        except Exception as e:
+            logger.error(f"Error persisting habits: {e}")
+            # A cached analysis would skip persistence on the next call; drop it so the write is retried
+            self._analysis_cache.pop(user_id, None)
+    
+    async def get_user_habits(self, user_id: str) -> List[Dict[str, Any]]:
+        """Get user's current habits, cached for HABIT_LIST_CACHE_TTL seconds"""
+        # Callers get their own copy so edits can't leak into the cache
+        return copy.deepcopy(await self._cached_user_habits(user_id))
+    
+    async def _cached_user_habits(self, user_id: str) -> List[Dict[str, Any]]:
+        """The shared habit list behind get_user_habits; callers must not modify it"""
+        cached = self._habits_cache.get(user_id)
+        if cached:
+            habits, fetched_at = cached
+            if (datetime.utcnow() - fetched_at).total_seconds() < HABIT_LIST_CACHE_TTL:
+                return habits
+        
+        try:
+            async with db_session() as db:
+                habits = await self._get_user_habit_rows(db, user_id)
             
-            return [self._habit_to_dict(habit) for habit in habits]
+            habit_dicts = [self._habit_to_dict(habit) for habit in habits]
+            self._habits_cache[user_id] = (habit_dicts, datetime.utcnow())
+            return habit_dicts
             
         except Exception as e:
             logger.error(f"Error getting user habits: {e}")
             return []
     
+    async def get_user_habits_json(self, user_id: str) -> str:
+        """Get user's current habits as a JSON array, encoded once per cached habit list"""
+        habits = await self._cached_user_habits(user_id)
+        
+        # The habit list is only replaced on refresh, so identity says whether the encoding is current
+        cached = self._habits_json_cache.get(user_id)
+        if cached and cached[0] is habits:
+            return cached[1]
+        
+        encoded = json.dumps(habits, separators=(",", ":"))
+        self._habits_json_cache[user_id] = (habits, encoded)
+        return encoded
+    
+    async def _get_user_habit_rows(self, db, user_id: str) -> List[UserHabit]:
+        """Get a user's active habit rows, most confident first"""
+        result = await db.execute(
+            select(UserHabit).where(
+                and_(
+                    UserHabit.user_id == user_id,
+                    UserHabit.is_active == True
+                )
+            ).order_by(desc(UserHabit.confidence))
+        )
+        return result.scalars().all()
+    
     async def suggest_proactive_actions(self, user_id: str) -> List[Dict[str, Any]]:
         """
         Get proactive suggestions based on user habits
@@ -119,61 +305,94 @@ class HabitEngine:
         Returns:
             List of proactive action suggestions
         """
-        try:
-            habits = await self.get_user_habits(user_id)
-            suggestions = []
+        suggestions = await self.suggest_proactive_actions_bulk([user_id])
+        return suggestions.get(str(user_id), [])
+    
+    async def suggest_proactive_actions_bulk(self, user_ids: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Get proactive suggestions for many users from one habits query
+        
+        Args:
+            user_ids: User identifiers
             
-            current_time = datetime.utcnow()
+        Returns:
+            Proactive action suggestions keyed by user ID
+        """
+        try:
+            async with db_session() as db:
+                result = await db.execute(
+                    select(UserHabit).where(
+                        and_(
+                            UserHabit.user_id.in_(user_ids),
+                            UserHabit.is_active == True
+                        )
+                    ).order_by(desc(UserHabit.confidence))
+                )
+                habits = result.scalars().all()
             
+            habits_by_user = defaultdict(list)
             for habit in habits:
-                # Check if habit is due soon
-                if habit.get('next_predicted'):
-                    next_time = datetime.fromisoformat(habit['next_predicted'])
-                    time_until = (next_time - current_time).total_seconds() / 3600  # hours
-                    
-                    if 0 <= time_until <= 4:  # Due within 4 hours
-                        suggestion = await self._generate_habit_suggestion(habit, time_until)
-                        if suggestion:
-                            suggestions.append(suggestion)
-                
-                # Check for missed habits
-                elif habit.get('last_observed'):
-                    last_time = datetime.fromisoformat(habit['last_observed'])
-                    hours_since = (current_time - last_time).total_seconds() / 3600
-                    
-                    # If habit is overdue by more than expected frequency
-                    expected_frequency = habit.get('pattern_data', {}).get('frequency_hours', 24)
-                    if hours_since > expected_frequency * 1.5:
-                        suggestion = await self._generate_missed_habit_suggestion(habit, hours_since)
-                        if suggestion:
-                            suggestions.append(suggestion)
-            
-            # Sort by priority and confidence
-            suggestions.sort(key=lambda x: (x.get('priority', 'medium'), x.get('confidence', 0)), reverse=True)
+                habits_by_user[str(habit.user_id)].append(habit)
             
-            return suggestions[:10]  # Return top 10 suggestions
+            current_time = datetime.utcnow()
+            return {
+                str(user_id): self._suggestions_from_habits(habits_by_user.get(str(user_id), []), current_time)
+                for user_id in user_ids
+            }
             
         except Exception as e:
             logger.error(f"Error getting proactive suggestions: {e}")
+            return {}
+    
+    def _suggestions_from_habits(self, habits: List[UserHabit], current_time: datetime) -> List[Dict[str, Any]]:
+        """Build a user's top suggestions from their habit rows"""
+        if not habits:
             return []
+        
+        # Time every habit in one vectorized pass (missing datetimes are NaT,
+        # whose comparisons are always false); only matching habits reach Python
+        now = np.datetime64(current_time)
+        next_predicted = _datetime64_array([habit.next_predicted for habit in habits])
+        hours_until = (next_predicted - now) / np.timedelta64(1, "h")
+        hours_since = (now - _datetime64_array([habit.last_observed for habit in habits])) / np.timedelta64(1, "h")
+        expected_frequency = np.fromiter(
+            ((habit.pattern_data or {}).get('frequency_hours', 24) for habit in habits),
+            dtype=np.float64,
+            count=len(habits)
+        )
+        
+        due_soon, missed = _habit_timing_masks(
+            hours_until, hours_since, expected_frequency, ~np.isnat(next_predicted)
+        )
+        
+        suggestions = []
+        for i in np.flatnonzero(due_soon | missed):
+            habit = habits[i]
+            if due_soon[i]:
+                suggestion = self._generate_habit_suggestion(habit, float(hours_until[i]))
+                if suggestion:
+                    suggestions.append(suggestion)
+            else:
+                suggestions.append(self._generate_missed_habit_suggestion(habit, float(hours_since[i])))
+        
+        # Top 10 suggestions by priority and confidence
+        return heapq.nlargest(10, suggestions, key=_suggestion_rank)
     
     async def get_today_habits(self, user_id: str) -> List[Dict[str, Any]]:
         """Get habits that are due today"""
         try:
-            habits = await self.get_user_habits(user_id)
-            today_habits = []
+            async with db_session() as db:
+                habits = await self._get_user_habit_rows(db, user_id)
             
             current_time = datetime.utcnow()
             today_start = current_time.replace(hour=0, minute=0, second=0, microsecond=0)
             today_end = today_start + timedelta(days=1)
             
-            for habit in habits:
-                if habit.get('next_predicted'):
-                    next_time = datetime.fromisoformat(habit['next_predicted'])
-                    if today_start <= next_time < today_end:
-                        today_habits.append(habit)
-            
-            return today_habits
+            # Window all predictions in one vectorized comparison (missing ones are NaT
+            # and never match); serialize only the habits returned
+            next_predicted = _datetime64_array([habit.next_predicted for habit in habits])
+            due_today = (next_predicted >= np.datetime64(today_start)) & (next_predicted < np.datetime64(today_end))
+            return [self._habit_to_dict(habits[i]) for i in np.flatnonzero(due_today)]
             
         except Exception as e:
             logger.error(f"Error getting today's habits: {e}")
@@ -191,16 +410,20 @@ class HabitEngine:
             Success status
         """
         try:
-            db = await anext(get_db())
-            
-            habit = db.query(UserHabit).filter(
-                and_(
-                    UserHabit.id == habit_id,
-                    UserHabit.user_id == user_id
+            async with db_session() as db:
+                result = await db.execute(
+                    select(UserHabit).where(
+                        and_(
+                            UserHabit.id == habit_id,
+                            UserHabit.user_id == user_id
+                        )
+                    )
                 )
-            ).first()
-            
-            if habit:
+                habit = result.scalars().first()
+                
+                if not habit:
+                    return False
+                
                 habit.last_observed = datetime.utcnow()
                 habit.observation_count += 1
                 
@@ -208,54 +431,119 @@ class HabitEngine:
                 habit.confidence = min(0.95, habit.confidence + 0.05)
                 
                 # Predict next occurrence
-                next_time = await self._predict_next_occurrence(habit)
+                next_time = self._predict_next_occurrence(habit)
                 habit.next_predicted = next_time
                 
-                db.commit()
+                # Read what the memory needs while the session is still open
+                action = (habit.pattern_data or {}).get('action', 'habit')
+                pattern_type = habit.pattern_type
+                confidence = habit.confidence
                 
-                # Store habit execution in memory
-                await memory_manager.store_memory(
-                    user_id=user_id,
-                    memory_type="habit_executed",
-                    content=f"Executed habit: {habit.pattern_data.get('action', 'habit')}",
-                    metadata={
-                        "habit_id": habit_id,
-                        "pattern_type": habit.pattern_type,
-                        "confidence": habit.confidence
-                    },
-                    importance_score=0.6
-                )
-                
-                logger.info(f"Marked habit {habit_id} as executed for user {user_id}")
-                return True
-            
-            return False
+                await db.commit()
+            
+            self._habits_cache.pop(user_id, None)
+            
+            # Store habit execution in memory with the next batched write
+            self._queue_memory_write({
+                "user_id": user_id,
+                "memory_type": "habit_executed",
+                "content": f"Executed habit: {action}",
+                "metadata": {
+                    "habit_id": habit_id,
+                    "pattern_type": pattern_type,
+                    "confidence": confidence
+                },
+                "importance_score": 0.6
+            })
+            
+            logger.info(f"Marked habit {habit_id} as executed for user {user_id}")
+            return True
             
         except Exception as e:
             logger.error(f"Error marking habit as executed: {e}")
             return False
     
-    async def _detect_time_patterns(self, user_id: str, memories: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def _queue_memory_write(self, memory: Dict[str, Any]):
+        """Queue a memory for the background batch writer, starting it on first use"""
+        if self._memory_flusher is None or self._memory_flusher.done():
+            self._memory_queue = self._memory_queue or asyncio.Queue()
+            self._memory_flusher = asyncio.create_task(self._flush_memory_writes())
+        self._memory_queue.put_nowait(memory)
+    
+    async def _flush_memory_writes(self):
+        """Write queued memories in batches of up to HABIT_MEMORY_BATCH_SIZE"""
+        while True:
+            batch = [await self._memory_queue.get()]
+            while len(batch) < HABIT_MEMORY_BATCH_SIZE:
+                try:
+                    batch.append(self._memory_queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    break
+            
+            try:
+                await memory_manager.store_memory_bulk(batch)
+            except Exception as e:
+                logger.error(f"Error writing {len(batch)} habit memories: {e}")
+            finally:
+                for _ in batch:
+                    self._memory_queue.task_done()
+            
+            # Let the next batch accumulate
+            await asyncio.sleep(HABIT_MEMORY_FLUSH_INTERVAL)
+    
+    async def close(self):
+        """Finish in-flight habit writes and queued habit memories, then stop the background writer"""
+        # Habit persistence runs in fire-and-forget tasks; let them land before shutdown
+        if self._pending_writes:
+            await asyncio.gather(*self._pending_writes, return_exceptions=True)
+        
+        if self._memory_flusher is None:
+            return
+        
+        # Wait for the writer to finish what's queued, then cancel it between batches
+        if not self._memory_flusher.done():
+            await self._memory_queue.join()
+        self._memory_flusher.cancel()
+        try:
+            await self._memory_flusher
+        except asyncio.CancelledError:
+            pass
+        self._memory_flusher = None
+    
+    def _scan_memories(self, memories: List[tuple]):
+        """
+        Walk (type, content, timestamp, id) rows once, collecting what each pattern detector needs
+        
+        Returns:
+            (time-pattern occurrences by key, timestamps by memory type,
+             memory types in order, timestamps in order)
+        """
+        time_buckets = defaultdict(list)
+        frequency_buckets = defaultdict(list)
+        types = []
+        timestamps = []
+        
+        for memory_type, content, timestamp, _ in memories:
+            types.append(memory_type)
+            timestamps.append(timestamp)
+            
+            if memory_type:
+                frequency_buckets[memory_type].append(timestamp)
+            
+            if memory_type in _TIME_PATTERN_TYPES:
+                # Extract time patterns
+                time_info = self._extract_time_from_content((content or "").lower(), timestamp)
+                if time_info:
+                    time_buckets[f"{memory_type}_{time_info['time_pattern']}"].append({
+                        "timestamp": timestamp,
+                        "time_info": time_info
+                    })
+        
+        return time_buckets, frequency_buckets, types, timestamps
+    
+    def _detect_time_patterns(self, user_id: str, time_patterns: Dict[str, List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
         """Detect time-based patterns (e.g., wake up at 7AM on weekdays)"""
         try:
-            time_patterns = defaultdict(list)
-            
-            # Group memories by type and extract time information
-            for memory in memories:
-                if memory.get("type") in ["reminder", "schedule", "habit", "sms"]:
-                    content = memory.get("content", "").lower()
-                    timestamp = memory.get("timestamp")
-                    
-                    # Extract time patterns
-                    time_info = self._extract_time_from_content(content, timestamp)
-                    if time_info:
-                        key = f"{memory['type']}_{time_info['time_pattern']}"
-                        time_patterns[key].append({
-                            "content": memory["content"],
-                            "timestamp": timestamp,
-                            "time_info": time_info
-                        })
-            
             # Analyze patterns
             habits = []
             for pattern_key, occurrences in time_patterns.items():
@@ -275,31 +563,23 @@ class HabitEngine:
             logger.error(f"Error detecting time patterns: {e}")
             return []
     
-    async def _detect_frequency_patterns(self, user_id: str, memories: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def _detect_frequency_patterns(self, user_id: str, frequency_patterns: Dict[str, List[datetime]]) -> List[Dict[str, Any]]:
         """Detect frequency-based patterns (e.g., check email every 2 hours)"""
         try:
-            frequency_patterns = defaultdict(list)
-            
-            # Group by memory type
-            for memory in memories:
-                memory_type = memory.get("type")
-                if memory_type:
-                    frequency_patterns[memory_type].append(memory.get("timestamp"))
-            
             habits = []
             
             for memory_type, timestamps in frequency_patterns.items():
                 if len(timestamps) >= 5:  # Need at least 5 occurrences
-                    # Calculate time intervals
-                    intervals = []
-                    sorted_timestamps = sorted(timestamps)
-                    
-                    for i in range(1, len(sorted_timestamps)):
-                        interval = (sorted_timestamps[i] - sorted_timestamps[i-1]).total_seconds() / 3600  # hours
-                        intervals.append(interval)
+                    # Calculate time intervals (hours) over a sorted epoch-seconds array
+                    epoch_seconds = np.fromiter(
+                        (timestamp.timestamp() for timestamp in timestamps),
+                        dtype=np.float64,
+                        count=len(timestamps)
+                    )
+                    intervals = np.diff(np.sort(epoch_seconds)) / 3600
                     
-                    if intervals:
-                        avg_interval = sum(intervals) / len(intervals)
+                    if intervals.size:
+                        avg_interval = float(intervals.mean())
                         consistency = self._calculate_consistency(intervals, avg_interval)
                         
                         if consistency > 0.6:  # Good consistency
@@ -321,37 +601,42 @@ class HabitEngine:
             logger.error(f"Error detecting frequency patterns: {e}")
             return []
     
-    async def _detect_context_patterns(self, user_id: str, memories: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def _detect_context_patterns(self, user_id: str, types: List[Optional[str]], timestamps: List[datetime]) -> List[Dict[str, Any]]:
         """Detect context-based patterns (e.g., always set reminder after meeting)"""
         try:
             context_patterns = defaultdict(list)
             
-            # Look for sequences of different memory types
-            for i, memory in enumerate(memories):
-                if i < len(memories) - 1:
-                    current_type = memory.get("type")
-                    next_type = memories[i + 1].get("type")
-                    
-                    if current_type and next_type and current_type != next_type:
-                        pattern_key = f"{current_type}_then_{next_type}"
-                        context_patterns[pattern_key].append({
-                            "first": memory,
-                            "second": memories[i + 1],
-                            "time_gap": (memories[i + 1].get("timestamp") - memory.get("timestamp")).total_seconds() / 60  # minutes
-                        })
+            # Pair memories in chronological order; gaps (minutes) computed in one pass
+            order = sorted((i for i, timestamp in enumerate(timestamps) if timestamp), key=timestamps.__getitem__)
+            types = [types[i] for i in order]
+            epoch_seconds = np.fromiter(
+                (timestamps[i].timestamp() for i in order),
+                dtype=np.float64,
+                count=len(order)
+            )
+            gaps = np.diff(epoch_seconds) / 60
+            
+            # Look for sequences of different memory types close enough to be related
+            for i in range(len(types) - 1):
+                if gaps[i] > _CONTEXT_MAX_GAP_MINUTES:
+                    continue
+                
+                current_type = types[i]
+                next_type = types[i + 1]
+                if current_type and next_type and current_type != next_type:
+                    context_patterns[(current_type, next_type)].append(gaps[i])
             
             habits = []
-            for pattern_key, occurrences in context_patterns.items():
+            for (trigger, action), occurrences in context_patterns.items():
                 if len(occurrences) >= 3:  # Minimum 3 occurrences
-                    avg_gap = sum(occ["time_gap"] for occ in occurrences) / len(occurrences)
+                    avg_gap = float(np.mean(occurrences))
                     
                     habits.append({
                         "pattern_type": "context_based",
                         "pattern_data": {
-                            "trigger": pattern_key.split("_then_")[0],
-                            "action": pattern_key.split("_then_")[1],
+                            "trigger": trigger,
                             "avg_gap_minutes": round(avg_gap, 1),
-                            "action": f"after {pattern_key.split('_then_')[0]}, do {pattern_key.split('_then_')[1]}"
+                            "action": f"after {trigger}, do {action}"
                         },
                         "confidence": min(0.7, len(occurrences) / 8.0),
                         "observations": len(occurrences)
@@ -363,45 +648,40 @@ class HabitEngine:
             logger.error(f"Error detecting context patterns: {e}")
             return []
     
-    async def _detect_sequence_patterns(self, user_id: str, memories: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def _detect_sequence_patterns(self, user_id: str, types: List[Optional[str]], timestamps: List[datetime]) -> List[Dict[str, Any]]:
         """Detect sequence patterns (e.g., morning routine: wake up -> check email -> set reminders)"""
         try:
-            # Look for recurring sequences of 3+ actions
-            sequence_patterns = defaultdict(list)
-            
-            # Check sequences of different lengths
+            # Look for recurring sequences of 3+ actions, one window length at a time
+            habits = []
             for seq_length in range(3, 6):  # 3 to 5 actions
-                for i in range(len(memories) - seq_length + 1):
-                    sequence = memories[i:i + seq_length]
-                    sequence_types = [m.get("type") for m in sequence]
-                    sequence_key = "_".join(sequence_types)
+                windows = range(len(types) - seq_length + 1)
+                counts = Counter(tuple(types[i:i + seq_length]) for i in windows)
+                
+                # At least 2 occurrences; only those sequences need durations
+                total_seconds = {sequence: 0.0 for sequence, count in counts.items() if count >= 2}
+                if not total_seconds:
+                    continue
+                
+                for i in windows:
+                    sequence = tuple(types[i:i + seq_length])
+                    if sequence in total_seconds:
+                        total_seconds[sequence] += (timestamps[i + seq_length - 1] - timestamps[i]).total_seconds()
+                
+                for sequence, seconds in total_seconds.items():
+                    occurrences = counts[sequence]
                     
-                    sequence_patterns[sequence_key].append({
-                        "sequence": sequence,
-                        "start_time": sequence[0].get("timestamp"),
-                        "end_time": sequence[-1].get("timestamp")
-                    })
-            
-            habits = []
-            for sequence_key, occurrences in sequence_patterns.items():
-                if len(occurrences) >= 2:  # At least 2 occurrences
                     # Calculate average duration
-                    durations = []
-                    for occ in occurrences:
-                        duration = (occ["end_time"] - occ["start_time"]).total_seconds() / 60  # minutes
-                        durations.append(duration)
-                    
-                    avg_duration = sum(durations) / len(durations)
+                    avg_duration = seconds / 60 / occurrences  # minutes
                     
                     habits.append({
                         "pattern_type": "sequence_based",
                         "pattern_data": {
-                            "sequence": sequence_key.split("_"),
+                            "sequence": list(sequence),
                             "avg_duration_minutes": round(avg_duration, 1),
-                            "action": f"follow sequence: {' -> '.join(sequence_key.split('_'))}"
+                            "action": f"follow sequence: {' -> '.join(sequence)}"
                         },
-                        "confidence": min(0.6, len(occurrences) / 6.0),
-                        "observations": len(occurrences)
+                        "confidence": min(0.6, occurrences / 6.0),
+                        "observations": occurrences
                     })
             
             return habits
@@ -416,43 +696,37 @@ class HabitEngine:
             content_lower = content.lower()
             
             # Look for specific times
-            time_patterns = [
-                r'(\d{1,2}):?(\d{2})\s*(am|pm)?',
-                r'(\d{1,2})\s*(am|pm)',
-                r'(\d{1,2})\s*o\'?clock'
-            ]
-            
-            for pattern in time_patterns:
-                match = re.search(pattern, content_lower)
-                if match:
-                    hour = int(match.group(1))
-                    minute = int(match.group(2)) if match.group(2) else 0
-                    
-                    # Handle AM/PM
-                    if 'pm' in content_lower and hour != 12:
-                        hour += 12
-                    elif 'am' in content_lower and hour == 12:
-                        hour = 0
-                    
-                    # Create time object
-                    time_obj = timestamp.replace(hour=hour, minute=minute, second=0, microsecond=0)
-                    
-                    return {
-                        "time_pattern": f"{hour:02d}:{minute:02d}",
-                        "hour": hour,
-                        "minute": minute,
-                        "time_obj": time_obj
-                    }
+            match = _TIME_RE.search(content_lower)
+            if match:
+                hour = int(match.group("h1") or match.group("h2") or match.group("h3"))
+                minute = int(match.group("m1") or 0)
+                
+                # Handle AM/PM, preferring a suffix on the matched time itself
+                meridiem = match.group("ap1") or match.group("ap2")
+                if not meridiem:
+                    ampm_match = _AMPM_RE.search(content_lower)
+                    meridiem = ampm_match.group(1) if ampm_match else None
+                if meridiem == 'pm' and hour != 12:
+                    hour += 12
+                elif meridiem == 'am' and hour == 12:
+                    hour = 0
+                
+                # Create time object
+                time_obj = timestamp.replace(hour=hour, minute=minute, second=0, microsecond=0)
+                
+                return {
+                    "time_pattern": f"{hour:02d}:{minute:02d}",
+                    "hour": hour,
+                    "minute": minute,
+                    "time_obj": time_obj
+                }
             
             # Look for relative times
-            if "morning" in content_lower:
-                return {"time_pattern": "morning", "hour": 8, "minute": 0}
-            elif "afternoon" in content_lower:
-                return {"time_pattern": "afternoon", "hour": 14, "minute": 0}
-            elif "evening" in content_lower:
-                return {"time_pattern": "evening", "hour": 18, "minute": 0}
-            elif "night" in content_lower:
-                return {"time_pattern": "night", "hour": 22, "minute": 0}
+            match = _RELATIVE_TIME_RE.search(content_lower)
+            if match:
+                period = match.group(0)
+                hour, minute = _RELATIVE_TIMES[period]
+                return {"time_pattern": period, "hour": hour, "minute": minute}
             
             return None
             
@@ -476,24 +750,25 @@ class HabitEngine:
             if not times:
                 return None
             
-            # Calculate average time
-            total_seconds = sum((t.hour * 3600 + t.minute * 60) for t in times)
-            avg_seconds = total_seconds / len(times)
-            avg_hour = avg_seconds // 3600
-            avg_minute = (avg_seconds % 3600) // 60
+            # Calculate average time of day in one vectorized reduction
+            seconds_of_day = np.fromiter(
+                (t.hour * 3600 + t.minute * 60 for t in times),
+                dtype=np.int64,
+                count=len(times)
+            )
+            avg_seconds = int(seconds_of_day.mean())
+            avg_hour, avg_minute = avg_seconds // 3600, (avg_seconds % 3600) // 60
             
             # Check for weekday patterns
-            weekday_counts = defaultdict(int)
-            for occ in occurrences:
-                timestamp = occ.get("timestamp")
-                if timestamp:
-                    weekday_counts[timestamp.weekday()] += 1
-            
-            dominant_weekdays = [day for day, count in weekday_counts.items() if count >= len(occurrences) * 0.3]
+            weekdays = [occ["timestamp"].weekday() for occ in occurrences if occ.get("timestamp")]
+            weekday_counts = np.bincount(weekdays, minlength=7)
+            dominant_weekdays = np.flatnonzero(weekday_counts >= len(occurrences) * 0.3).tolist()
             
             return {
                 "action": f"activity at {avg_hour:02d}:{avg_minute:02d}",
                 "avg_time": f"{avg_hour:02d}:{avg_minute:02d}",
+                "avg_hour": avg_hour,
+                "avg_minute": avg_minute,
                 "weekdays": dominant_weekdays,
                 "consistency": min(0.9, len(occurrences) / 10.0)
             }
@@ -502,95 +777,74 @@ class HabitEngine:
             logger.error(f"Error analyzing time pattern: {e}")
             return None
     
-    def _calculate_consistency(self, intervals: List[float], avg_interval: float) -> float:
+    def _calculate_consistency(self, intervals: np.ndarray, avg_interval: float) -> float:
         """Calculate consistency of intervals"""
         try:
-            if not intervals:
+            if not intervals.size or avg_interval <= 0:
                 return 0.0
             
-            # Calculate standard deviation
-            variance = sum((x - avg_interval) ** 2 for x in intervals) / len(intervals)
-            std_dev = variance ** 0.5
-            
             # Consistency is inverse of coefficient of variation
-            if avg_interval > 0:
-                cv = std_dev / avg_interval
-                consistency = max(0.0, 1.0 - cv)
-                return min(1.0, consistency)
-            
-            return 0.0
+            cv = float(intervals.std()) / avg_interval
+            return min(1.0, max(0.0, 1.0 - cv))
             
         except Exception as e:
             logger.error(f"Error calculating consistency: {e}")
             return 0.0
     
-    async def _store_habits(self, user_id: str, habits: List[Dict[str, Any]]):
-        """Store detected habits in database"""
-        try:
-            db = await anext(get_db())
-            
-            for habit_data in habits:
-                # Check if habit already exists
-                existing = db.query(UserHabit).filter(
-                    and_(
-                        UserHabit.user_id == user_id,
-                        UserHabit.pattern_type == habit_data["pattern_type"]
-                    )
-                ).first()
-                
-                if existing:
-                    # Update existing habit
-                    existing.pattern_data = habit_data["pattern_data"]
-                    existing.confidence = max(existing.confidence, habit_data["confidence"])
-                    existing.observation_count = max(existing.observation_count, habit_data["observations"])
-                    existing.last_observed = datetime.utcnow()
-                else:
-                    # Create new habit
-                    new_habit = UserHabit(
-                        user_id=user_id,
-                        pattern_type=habit_data["pattern_type"],
-                        pattern_data=habit_data["pattern_data"],
-                        confidence=habit_data["confidence"],
-                        observation_count=habit_data["observations"],
-                        last_observed=datetime.utcnow()
-                    )
-                    db.add(new_habit)
-            
-            db.commit()
-            logger.info(f"Stored {len(habits)} habits for user {user_id}")
-            
-        except Exception as e:
-            logger.error(f"Error storing habits: {e}")
+    async def _store_habits(self, db, user_id: str, habits: List[Dict[str, Any]]) -> Dict[str, UserHabit]:
+        """
+        Upsert detected habits in one statement, returning the persisted rows by pattern type
+        
+        Errors propagate so _persist_habits can tell the write failed
+        """
+        if not habits:
+            return {}
+        
+        # One row per pattern type: an upsert can't touch the same row twice
+        now = datetime.utcnow()
+        rows = {}
+        for habit_data in habits:
+            pattern_type = habit_data["pattern_type"]
+            row = rows.get(pattern_type)
+            rows[pattern_type] = {
+                "user_id": user_id,
+                "pattern_type": pattern_type,
+                "pattern_data": habit_data["pattern_data"],
+                "confidence": max(habit_data["confidence"], row["confidence"]) if row else habit_data["confidence"],
+                "observation_count": max(habit_data["observations"], row["observation_count"]) if row else habit_data["observations"],
+                "last_observed": now
+            }
+        
+        stmt = pg_insert(UserHabit).values(list(rows.values()))
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["user_id", "pattern_type"],
+            set_={
+                "pattern_data": stmt.excluded.pattern_data,
+                "confidence": func.greatest(UserHabit.confidence, stmt.excluded.confidence),
+                "observation_count": func.greatest(UserHabit.observation_count, stmt.excluded.observation_count),
+                "last_observed": stmt.excluded.last_observed
+            }
+        ).returning(UserHabit)
+        
+        habit_rows = (await db.scalars(stmt, execution_options={"populate_existing": True})).all()
+        
+        logger.info(f"Stored {len(habits)} habits for user {user_id}")
+        return {habit.pattern_type: habit for habit in habit_rows}
     
-    async def _update_habit_predictions(self, user_id: str, habits: List[Dict[str, Any]]):
-        """Update predictions for when habits will occur next"""
-        try:
-            db = await anext(get_db())
-            
-            for habit_data in habits:
-                # Find the habit in database
-                habit = db.query(UserHabit).filter(
-                    and_(
-                        UserHabit.user_id == user_id,
-                        UserHabit.pattern_type == habit_data["pattern_type"]
-                    )
-                ).first()
-                
-                if habit:
-                    # Predict next occurrence
-                    next_time = await self._predict_next_occurrence(habit)
-                    habit.next_predicted = next_time
-                    
-                    # Generate proactive suggestions
-                    suggestions = await self._generate_proactive_suggestions(habit)
-                    habit.proactive_suggestions = suggestions
-            
-            db.commit()
-            
-        except Exception as e:
-            logger.error(f"Error updating habit predictions: {e}")
+    async def _update_habit_predictions(self, db, habit_rows: Dict[str, UserHabit]):
+        """Update predictions for when stored habits will occur next, then commit; errors propagate"""
+        for habit in habit_rows.values():
+            # Predict next occurrence
+            next_time = self._predict_next_occurrence(habit)
+            habit.next_predicted = next_time
+            
+            # Generate proactive suggestions
+            suggestions = self._generate_proactive_suggestions(habit)
+            habit.proactive_suggestions = suggestions
+        
+        await db.commit()
     
-    async def _predict_next_occurrence(self, habit: UserHabit) -> Optional[datetime]:
+    def _predict_next_occurrence(self, habit: UserHabit) -> Optional[datetime]:
         """Predict when the habit will occur next"""
         try:
             if not habit.last_observed:
@@ -603,8 +857,16 @@ class HabitEngine:
                 last_time = habit.last_observed
                 next_time = last_time + timedelta(days=1)
                 
-                # Adjust for specific time if available
-                if "avg_time" in pattern_data:
+                # Adjust for specific time if available; rows stored before
+                # avg_hour/avg_minute existed only carry the "HH:MM" string
+                if "avg_hour" in pattern_data:
+                    next_time = next_time.replace(
+                        hour=pattern_data["avg_hour"],
+                        minute=pattern_data["avg_minute"],
+                        second=0,
+                        microsecond=0
+                    )
+                elif "avg_time" in pattern_data:
                     time_parts = pattern_data["avg_time"].split(":")
                     hour = int(time_parts[0])
                     minute = int(time_parts[1])
@@ -632,7 +894,7 @@ class HabitEngine:
             logger.error(f"Error predicting next occurrence: {e}")
             return None
     
-    async def _generate_proactive_suggestions(self, habit: UserHabit) -> List[Dict[str, Any]]:
+    def _generate_proactive_suggestions(self, habit: UserHabit) -> List[Dict[str, Any]]:
         """Generate proactive suggestions for a habit"""
         try:
             suggestions = []
@@ -676,28 +938,28 @@ class HabitEngine:
             logger.error(f"Error generating proactive suggestions: {e}")
             return []
     
-    async def _generate_habit_suggestion(self, habit: Dict[str, Any], hours_until: float) -> Optional[Dict[str, Any]]:
+    def _generate_habit_suggestion(self, habit: UserHabit, hours_until: float) -> Optional[Dict[str, Any]]:
         """Generate a suggestion for a specific habit"""
         try:
-            pattern_data = habit.get('pattern_data', {})
+            pattern_data = habit.pattern_data or {}
             
             if hours_until <= 1:
                 message = f"Time for your {pattern_data.get('action', 'habit')} now!"
-                priority = "high"
+                priority = SuggestionPriority.HIGH
             elif hours_until <= 2:
                 message = f"Your {pattern_data.get('action', 'habit')} is due in {int(hours_until)} hours"
-                priority = "medium"
+                priority = SuggestionPriority.MEDIUM
             else:
                 message = f"Your {pattern_data.get('action', 'habit')} is coming up in {int(hours_until)} hours"
-                priority = "low"
+                priority = SuggestionPriority.LOW
             
             return {
                 'type': 'habit_reminder',
                 'priority': priority,
                 'message': message,
                 'action': 'execute_habit',
-                'habit_id': habit.get('id'),
-                'confidence': habit.get('confidence', 0.5),
+                'habit_id': habit.id,
+                'confidence': habit.confidence if habit.confidence is not None else 0.5,
                 'hours_until': hours_until
             }
             
@@ -705,39 +967,49 @@ class HabitEngine:
             logger.error(f"Error generating habit suggestion: {e}")
             return None
     
-    async def _generate_missed_habit_suggestion(self, habit: Dict[str, Any], hours_since: float) -> Optional[Dict[str, Any]]:
-        """Generate a suggestion for a missed habit"""
-        try:
-            pattern_data = habit.get('pattern_data', {})
-            
-            message = f"You missed your {pattern_data.get('action', 'habit')} ({int(hours_since)} hours ago). Want to do it now?"
-            
-            return {
-                'type': 'missed_habit',
-                'priority': 'medium',
-                'message': message,
-                'action': 'execute_habit',
-                'habit_id': habit.get('id'),
-                'confidence': habit.get('confidence', 0.5),
-                'hours_since': hours_since
-            }
-            
-        except Exception as e:
-            logger.error(f"Error generating missed habit suggestion: {e}")
-            return None
+    def _generate_missed_habit_suggestion(self, habit: UserHabit, hours_since: float) -> Dict[str, Any]:
+        """Generate a suggestion for a missed habit; errors surface to the batch caller"""
+        pattern_data = habit.pattern_data or {}
+        
+        suggestion = _MISSED_HABIT_SUGGESTION.copy()
+        suggestion['message'] = _missed_habit_template(pattern_data.get('action', 'habit')) % int(hours_since)
+        suggestion['habit_id'] = habit.id
+        suggestion['confidence'] = habit.confidence if habit.confidence is not None else 0.5
+        suggestion['hours_since'] = hours_since
+        return suggestion
     
     def _habit_to_dict(self, habit: UserHabit) -> Dict[str, Any]:
         """Convert habit object to dictionary"""
+        (habit_id, pattern_type, pattern_data, confidence,
+         observation_count, proactive_suggestions) = _HABIT_FIELDS(habit)
+        last_observed, next_predicted = habit.iso_timestamps()
         return {
-            "id": habit.id,
-            "pattern_type": habit.pattern_type,
-            "pattern_data": habit.pattern_data,
-            "confidence": habit.confidence,
-            "last_observed": habit.last_observed.isoformat() if habit.last_observed else None,
-            "observation_count": habit.observation_count,
-            "next_predicted": habit.next_predicted.isoformat() if habit.next_predicted else None,
-            "proactive_suggestions": habit.proactive_suggestions or []
+            "id": habit_id,
+            "pattern_type": pattern_type,
+            "pattern_data": pattern_data,
+            "confidence": confidence,
+            "last_observed": last_observed,
+            "observation_count": observation_count,
+            "next_predicted": next_predicted,
+            "proactive_suggestions": proactive_suggestions or []
         }
 
-# Global habit engine instance
-habit_engine = HabitEngine()
+
+@cache
+def get_habit_engine() -> HabitEngine:
+    """Shared habit engine, constructed on first use rather than at import"""
+    return HabitEngine()
+
+
+async def close_habit_engine():
+    """Finish the shared habit engine's pending writes and stop its background writer, if it was ever built"""
+    if get_habit_engine.cache_info().currsize:
+        await get_habit_engine().close()
+
+
+def __getattr__(name: str):
+    # Keep `from services.habit_engine import habit_engine` working, resolved lazily
+    if name == "habit_engine":
+        return get_habit_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
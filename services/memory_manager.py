@@ -4,27 +4,193 @@ Pluto Memory Manager
 Handles long-term memory with Postgres and fast recall with Redis
 """
 
+import asyncio
+import base64
+import hashlib
 import json
 import logging
-from datetime import datetime, timedelta
+import re
+from datetime import datetime, timedelta, timezone
 from typing import List, Dict, Any, Optional
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, desc, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, aliased, load_only
+from sqlalchemy import JSON, Integer, and_, bindparam, case, cast, desc, func, insert, lambda_stmt, or_, select, update
+import numpy as np
 import redis.asyncio as redis
 
-from db.database import get_db
+from db.database import get_db, db_session
 from db.models import UserMemory, UserHabit, ProactiveTask, ExternalContact, UserPreference, UserStyleProfile, RelationshipGraph, ContextSnapshot
 from config import settings
 from utils.logging_config import get_logger
-from utils.constants import MAX_MEMORY_RECALL, MAX_CONTEXT_ITEMS, CACHE_TTL
+from utils.constants import MAX_MEMORY_RECALL, MAX_CONTEXT_ITEMS, CACHE_TTL, REDIS_MAX_CONNECTIONS, EMBEDDING_CACHE_TTL
 
 # Helper function for Python 3.9 compatibility
 async def get_db_session():
     """Get database session with Python 3.9 compatibility"""
     return await get_db().__anext__()
 
+
+async def _fetch_scalars(stmt, params: Optional[Dict[str, Any]] = None) -> List[Any]:
+    """Run a read on its own session so independent reads can be gathered"""
+    async with db_session() as session:
+        return (await session.execute(stmt, params or {})).scalars().all()
+
+
+async def _fetch_rows(stmt, params: Optional[Dict[str, Any]] = None) -> List[Any]:
+    """Row-returning counterpart of _fetch_scalars"""
+    async with db_session() as session:
+        return (await session.execute(stmt, params or {})).all()
+
+
 logger = get_logger(__name__)
 
+# Columns _memory_to_dict reads; keeps the embedding blob off the wire for non-semantic reads
+_MEMORY_DICT_COLUMNS = load_only(
+    UserMemory.id,
+    UserMemory.user_id,
+    UserMemory.timestamp,
+    UserMemory.type,
+    UserMemory.content,
+    UserMemory.context_data,
+    UserMemory.related_memories,
+    UserMemory.importance_score,
+    UserMemory.is_active
+)
+
+# As above, plus the float32 embedding for the exact semantic-search rerank
+_MEMORY_RERANK_COLUMNS = load_only(
+    UserMemory.id,
+    UserMemory.user_id,
+    UserMemory.timestamp,
+    UserMemory.type,
+    UserMemory.content,
+    UserMemory.context_data,
+    UserMemory.related_memories,
+    UserMemory.importance_score,
+    UserMemory.is_active,
+    UserMemory.embedding
+)
+
+# Preference lookups, built once with a bound user_id so their compiled SQL is reused
+_STYLE_PROFILE_STMT = select(UserStyleProfile).where(
+    UserStyleProfile.user_id == bindparam("user_id")
+).limit(1)
+_PREFERENCES_STMT = select(UserPreference).where(
+    UserPreference.user_id == bindparam("user_id")
+)
+_ACTIVE_HABITS_STMT = select(UserHabit).where(
+    UserHabit.user_id == bindparam("user_id"),
+    UserHabit.is_active == True
+)
+
+# Semantic search reranks this many int8-scored candidates per requested result
+_RERANK_FACTOR = 4
+
+# Recent-context entries are written compact, without the default ", "/": " padding
+_encode_context = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False).encode
+
+# Embeddings are stored as raw big-endian float32, the byte layout Postgres' float4send produces
+_EMBEDDING_DTYPE = np.dtype(">f4")
+
+
+def _keyword_scanner(keyword_groups):
+    """
+    Compile keyword groups into one regex plus a keyword -> group index map
+    
+    The pattern is a lookahead, so finditer reports every keyword occurrence,
+    overlapping ones included, in a single pass; longer keywords are tried first.
+    A keyword listed in several groups maps to the earliest.
+    """
+    keywords = {}
+    for index, group in enumerate(keyword_groups):
+        for keyword in group:
+            keywords.setdefault(keyword, index)
+    alternation = "|".join(re.escape(keyword) for keyword in sorted(keywords, key=len, reverse=True))
+    return re.compile(f"(?=({alternation}))"), keywords
+
+
+# Urgency keyword tiers, most urgent first
+_URGENCY_LEVELS = ("critical", "high", "medium")
+_URGENCY_RE, _URGENCY_KEYWORDS = _keyword_scanner((
+    ("urgent", "emergency", "asap", "immediately", "now", "critical", "deadline", "due today"),
+    ("important", "soon", "today", "this afternoon", "this evening", "priority"),
+    ("tomorrow", "this week", "soon", "when you can", "sometime")
+))
+
+# ProactiveTask priority (1-10, higher = more urgent) for each urgency level
+_URGENCY_PRIORITY = {"critical": 10, "high": 8, "medium": 5, "low": 3}
+
+# Reminder timing adjustments, in precedence order: (keywords, hours -> adjusted hours)
+_TIMING_RULES = (
+    (("morning", "breakfast"), lambda hours: max(1, hours - 2)),  # Earlier for morning tasks
+    (("evening", "dinner"), lambda hours: min(24, hours + 2)),  # Later for evening tasks
+    (("tomorrow",), lambda hours: 24),  # Tomorrow = 24 hours
+    (("next week",), lambda hours: 168),  # Next week = 7 days
+    (("this afternoon",), lambda hours: 4),  # This afternoon = 4 hours
+    (("tonight",), lambda hours: 8)  # Tonight = 8 hours
+)
+_TIMING_RE, _TIMING_KEYWORDS = _keyword_scanner(keywords for keywords, _ in _TIMING_RULES)
+
+
+_EMBEDDING_MODEL = "text-embedding-3-small"
+
+
+def _embedding_cache_key(text: str) -> str:
+    """Redis key for a text's cached embedding, scoped to the embedding model"""
+    digest = hashlib.blake2b(f"{_EMBEDDING_MODEL}:{text}".encode(), digest_size=16).hexdigest()
+    return f"emb:{digest}"
+
+
+def _encode_cached_embedding(embedding: List[float]) -> str:
+    # The shared client decodes responses as text, so cache the float32 bytes base64-encoded
+    return base64.b64encode(np.asarray(embedding, dtype=_EMBEDDING_DTYPE).tobytes()).decode("ascii")
+
+
+def _decode_cached_embedding(value: str) -> List[float]:
+    return np.frombuffer(base64.b64decode(value), dtype=_EMBEDDING_DTYPE).tolist()
+
+
+# One pooled Redis client per process, shared across MemoryManager instances
+_redis_client: Optional[redis.Redis] = None
+
+
+def _shared_redis_client() -> redis.Redis:
+    """Build the process-wide Redis client on first use"""
+    global _redis_client
+    if _redis_client is None:
+        _redis_client = redis.Redis(connection_pool=redis.ConnectionPool(
+            host=settings.REDIS_HOST,
+            port=settings.REDIS_PORT,
+            password=settings.REDIS_PASSWORD,
+            max_connections=REDIS_MAX_CONNECTIONS,
+            socket_keepalive=True,
+            decode_responses=True
+        ))
+    return _redis_client
+
+
+def _unit_vector(embedding: List[float]) -> np.ndarray:
+    """L2-normalize an embedding so cosine similarity reduces to a dot product"""
+    vector = np.asarray(embedding, dtype=np.float32)
+    return vector / (np.linalg.norm(vector) + 1e-12)
+
+
+def _quantize_embedding(embedding: Optional[List[float]]) -> Optional[bytes]:
+    """Pack an embedding as int8, scaled so its largest component maps to +/-127"""
+    if not embedding:
+        return None
+    vector = np.asarray(embedding, dtype=np.float32)
+    scale = 127 / max(float(np.abs(vector).max()), 1e-12)
+    return np.clip(np.round(vector * scale), -127, 127).astype(np.int8).tobytes()
+
+
+def _encode_embedding(embedding: Optional[List[float]]) -> Optional[bytes]:
+    """Pack an embedding vector, unit-normalized, into its stored byte form"""
+    if not embedding:
+        return None
+    return _unit_vector(embedding).astype(_EMBEDDING_DTYPE).tobytes()
+
+
 class MemoryManager:
     """Pluto's memory manager - never forgets anything"""
     
@@ -36,13 +202,8 @@ class MemoryManager:
     def _init_clients(self):
         """Initialize Redis and OpenAI clients"""
         try:
-            # Redis for fast context recall
-            self.redis_client = redis.Redis(
-                host=settings.REDIS_HOST,
-                port=settings.REDIS_PORT,
-                password=settings.REDIS_PASSWORD,
-                decode_responses=True
-            )
+            # Redis for fast context recall, shared by every instance
+            self.redis_client = _shared_redis_client()
             logger.info("Redis client initialized")
         except Exception as e:
             logger.warning(f"Redis not available: {e}")
@@ -66,7 +227,8 @@ class MemoryManager:
         metadata: Optional[Dict[str, Any]] = None,
         importance_score: float = 0.5,
         related_memories: Optional[List[int]] = None,
-        schedule_reminder: bool = True
+        schedule_reminder: bool = True,
+        db: Optional[AsyncSession] = None
     ) -> int:
         """
         Store a new memory in Postgres with embedding and relationships
@@ -78,50 +240,135 @@ class MemoryManager:
             metadata: Additional context data
             importance_score: Importance score (0.0 to 1.0)
             related_memories: List of related memory IDs
+            db: Session to use; one is opened for this call if omitted
             
         Returns:
             Memory ID
         """
         try:
-            # Generate embedding for semantic search
-            embedding = None
-            if self.openai_client:
-                embedding = await self._generate_embedding(content)
+            if db is None:
+                async with db_session() as session:
+                    return await self._store_memory_internal(
+                        session, user_id, memory_type, content, metadata,
+                        importance_score, related_memories, schedule_reminder
+                    )
             
-            # Store in Postgres
-            db = await get_db_session()
-            memory = UserMemory(
-                user_id=user_id,
-                type=memory_type,
-                content=content,
-                embedding=json.dumps(embedding) if embedding else None,
-                context_data=metadata or {},
-                related_memories=related_memories or [],
-                importance_score=importance_score
+            return await self._store_memory_internal(
+                db, user_id, memory_type, content, metadata,
+                importance_score, related_memories, schedule_reminder
             )
-            db.add(memory)
-            await db.commit()
-            await db.refresh(memory)
             
-            # Store recent context in Redis (last 24h)
-            await self._store_recent_context(user_id, memory_type, content, memory.id)
+        except Exception as e:
+            logger.error(f"Error storing memory: {e}")
+            raise
+    
+    async def _store_memory_internal(
+        self,
+        db: AsyncSession,
+        user_id: int,
+        memory_type: str,
+        content: str,
+        metadata: Optional[Dict[str, Any]],
+        importance_score: float,
+        related_memories: Optional[List[int]],
+        schedule_reminder: bool
+    ) -> int:
+        """Store a memory, its relationships and importance boost on one session"""
+        now = datetime.now(timezone.utc)
+        
+        # Generate embedding for semantic search
+        embedding = None
+        if self.openai_client:
+            embedding = await self._generate_embedding(content)
+        
+        # Store in Postgres; the memory, its relationships, importance boost and reminder commit together
+        memory = UserMemory(
+            user_id=user_id,
+            timestamp=now,
+            type=memory_type,
+            content=content,
+            embedding=_encode_embedding(embedding),
+            embedding_i8=_quantize_embedding(embedding),
+            context_data=metadata or {},
+            related_memories=related_memories or [],
+            importance_score=importance_score
+        )
+        db.add(memory)
+        await db.flush()
+        
+        # Update relationship graph if related memories exist
+        if related_memories:
+            await self._update_relationship_graph(user_id, memory.id, related_memories, db)
+        
+        # Update importance scores based on relationships
+        await self._update_importance_scores(user_id, memory.id, db)
+        
+        # Schedule smart reminder if requested and it's a reminder-type memory
+        if schedule_reminder and memory_type in ["reminder", "todo", "note", "voice_note"]:
+            self._schedule_smart_reminder(db, user_id, memory.id, content, importance_score, now)
+        
+        await db.commit()
+        
+        # Store recent context in Redis (last 24h)
+        await self._store_recent_context(user_id, memory_type, content, memory.id, now)
+        
+        logger.info(f"Stored memory for user {user_id}: {memory_type} (ID: {memory.id})")
+        return memory.id
+    
+    async def store_memory_bulk(self, memories: List[Dict[str, Any]]) -> List[int]:
+        """
+        Store several memories in one transaction
+        
+        Meant for log-style memories: related memories and smart reminders
+        are not handled here, use store_memory for those.
+        
+        Args:
+            memories: Dicts with user_id, memory_type, content and optional
+                metadata and importance_score, as accepted by store_memory
             
-            # Update relationship graph if related memories exist
-            if related_memories:
-                await self._update_relationship_graph(user_id, memory.id, related_memories)
+        Returns:
+            Memory IDs, in input order
+        """
+        try:
+            if not memories:
+                return []
             
-            # Update importance scores based on relationships
-            await self._update_importance_scores(user_id, memory.id)
+            # One embeddings request for the whole batch
+            embeddings = [None] * len(memories)
+            if self.openai_client:
+                embeddings = await self._generate_embeddings([m["content"] for m in memories])
+            
+            now = datetime.now(timezone.utc)
+            rows = [
+                UserMemory(
+                    user_id=m["user_id"],
+                    timestamp=now,
+                    type=m["memory_type"],
+                    content=m["content"],
+                    embedding=_encode_embedding(embedding),
+                    embedding_i8=_quantize_embedding(embedding),
+                    context_data=m.get("metadata") or {},
+                    related_memories=[],
+                    importance_score=m.get("importance_score", 0.5)
+                )
+                for m, embedding in zip(memories, embeddings)
+            ]
+            async with db_session() as db:
+                db.add_all(rows)
+                await db.flush()
+                memory_ids = [row.id for row in rows]
+                await db.commit()
             
-            # Schedule smart reminder if requested and it's a reminder-type memory
-            if schedule_reminder and memory_type in ["reminder", "todo", "note", "voice_note"]:
-                await self._schedule_smart_reminder(user_id, memory.id, content, importance_score)
+            await self._store_recent_contexts([
+                (m["user_id"], m["memory_type"], m["content"], memory_id)
+                for m, memory_id in zip(memories, memory_ids)
+            ], now)
             
-            logger.info(f"Stored memory for user {user_id}: {memory_type} (ID: {memory.id})")
-            return memory.id
+            logger.info(f"Stored {len(memory_ids)} memories in bulk")
+            return memory_ids
             
         except Exception as e:
-            logger.error(f"Error storing memory: {e}")
+            logger.error(f"Error storing memories in bulk: {e}")
             raise
     
     async def recall_memory(
@@ -154,24 +401,27 @@ class MemoryManager:
                 # Semantic search using embeddings
                 return await self._semantic_search(user_id, query, limit, min_importance)
             else:
-                # Traditional search by type and time
-                query_filter = and_(
+                # Traditional search by type and time; lambda statements cache their compiled
+                # SQL per shape, with user_id, cutoff etc. bound as parameters
+                stmt = lambda_stmt(lambda: select(UserMemory).options(_MEMORY_DICT_COLUMNS).where(
                     UserMemory.user_id == user_id,
                     UserMemory.is_active == True,
                     UserMemory.importance_score >= min_importance
-                )
+                ))
                 
                 if memory_type:
-                    query_filter = and_(query_filter, UserMemory.type == memory_type)
+                    stmt += lambda s: s.where(UserMemory.type == memory_type)
                 
                 if hours_back > 0:
                     cutoff_time = datetime.utcnow() - timedelta(hours=hours_back)
-                    query_filter = and_(query_filter, UserMemory.timestamp >= cutoff_time)
+                    stmt += lambda s: s.where(UserMemory.timestamp >= cutoff_time)
                 
-                memories = db.query(UserMemory).filter(query_filter).order_by(
+                stmt += lambda s: s.order_by(
                     desc(UserMemory.importance_score),
                     desc(UserMemory.timestamp)
-                ).limit(limit).all()
+                ).limit(limit)
+                
+                memories = (await db.execute(stmt)).scalars().all()
                 
                 return [self._memory_to_dict(memory) for memory in memories]
                 
@@ -179,6 +429,48 @@ class MemoryManager:
             logger.error(f"Error recalling memory: {e}")
             return []
     
+    async def recall_memory_projection(
+        self,
+        user_id: int,
+        hours_back: int = 24,
+        limit: int = 1000
+    ) -> List[tuple]:
+        """
+        Recall only (type, content, timestamp, id) for a user's recent memories
+        
+        Args:
+            user_id: User identifier
+            hours_back: Hours to look back
+            limit: Maximum number of memories to return
+        
+        Returns:
+            List of (type, content, timestamp, id) tuples, newest first, with raw datetimes
+        """
+        try:
+            query_filter = and_(
+                UserMemory.user_id == user_id,
+                UserMemory.is_active == True
+            )
+            
+            if hours_back > 0:
+                cutoff_time = datetime.utcnow() - timedelta(hours=hours_back)
+                query_filter = and_(query_filter, UserMemory.timestamp >= cutoff_time)
+            
+            # Stream the narrow rows in batches instead of loading full memory objects
+            async with db_session() as db:
+                rows = await db.stream(
+                    select(UserMemory.type, UserMemory.content, UserMemory.timestamp, UserMemory.id)
+                    .where(query_filter)
+                    .order_by(desc(UserMemory.timestamp))
+                    .limit(limit)
+                    .execution_options(yield_per=500)
+                )
+                return [tuple(row) async for row in rows]
+        
+        except Exception as e:
+            logger.error(f"Error recalling memory projection: {e}")
+            return []
+    
     async def _semantic_search(
         self, 
         user_id: str, 
@@ -193,35 +485,64 @@ class MemoryManager:
             if not query_embedding:
                 return []
             
-            # Get all user memories with embeddings
-            db = await get_db_session()
-            memories = db.query(UserMemory).filter(
-                and_(
-                    UserMemory.user_id == user_id,
-                    UserMemory.is_active == True,
-                    UserMemory.embedding.isnot(None),
-                    UserMemory.importance_score >= min_importance
-                )
-            ).limit(MAX_MEMORY_RECALL).all()
-            
+            # Shortlist the user's most recent memories whose embeddings match the query's
+            # dimension by scoring their int8 copies (a quarter of the bytes); rows stored
+            # before quantization fall back to their float32 embedding
+            dimension = len(query_embedding)
+            async with db_session() as db:
+                candidates = (await db.execute(
+                    select(
+                        UserMemory.id,
+                        UserMemory.embedding_i8,
+                        case((UserMemory.embedding_i8.is_(None), UserMemory.embedding))
+                    ).where(
+                        and_(
+                            UserMemory.user_id == user_id,
+                            UserMemory.is_active == True,
+                            UserMemory.embedding.isnot(None),
+                            func.length(UserMemory.embedding) == dimension * _EMBEDDING_DTYPE.itemsize,
+                            UserMemory.importance_score >= min_importance
+                        )
+                    ).order_by(desc(UserMemory.timestamp)).limit(MAX_MEMORY_RECALL)
+                )).all()
+                
+                if not candidates:
+                    return []
+                
+                matrix = np.empty((len(candidates), dimension), dtype=np.float32)
+                quantized = [i for i, (_, embedding_i8, _) in enumerate(candidates) if embedding_i8 is not None]
+                legacy = [i for i, (_, embedding_i8, _) in enumerate(candidates) if embedding_i8 is None]
+                if quantized:
+                    matrix[quantized] = np.frombuffer(
+                        b"".join(candidates[i][1] for i in quantized), dtype=np.int8
+                    ).reshape(len(quantized), dimension)
+                if legacy:
+                    matrix[legacy] = np.frombuffer(
+                        b"".join(candidates[i][2] for i in legacy), dtype=_EMBEDDING_DTYPE
+                    ).reshape(len(legacy), dimension)
+                
+                # Quantized rows are scaled per vector, so compare by cosine rather than raw dot product
+                query_vector = _unit_vector(query_embedding)
+                similarities = (matrix @ query_vector) / np.maximum(np.linalg.norm(matrix, axis=1), 1e-12)
+                shortlist = np.arange(len(candidates))
+                if len(candidates) > limit * _RERANK_FACTOR:
+                    shortlist = np.argpartition(-similarities, limit * _RERANK_FACTOR)[:limit * _RERANK_FACTOR]
+                
+                # Exact float32 rerank of the shortlist; stored vectors are unit length
+                memories = (await db.execute(
+                    select(UserMemory).options(_MEMORY_RERANK_COLUMNS).where(
+                        UserMemory.id.in_([int(candidates[i][0]) for i in shortlist])
+                    )
+                )).scalars().all()
             if not memories:
                 return []
             
-            # Calculate cosine similarity
-            similarities = []
-            for memory in memories:
-                try:
-                    memory_embedding = json.loads(memory.embedding)
-                    similarity = self._cosine_similarity(query_embedding, memory_embedding)
-                    similarities.append((similarity, memory))
-                except (json.JSONDecodeError, TypeError):
-                    continue
-            
-            # Sort by similarity and return top results
-            similarities.sort(key=lambda x: x[0], reverse=True)
-            top_memories = similarities[:limit]
+            exact = np.frombuffer(
+                b"".join(memory.embedding for memory in memories), dtype=_EMBEDDING_DTYPE
+            ).reshape(len(memories), dimension) @ query_vector
+            top = np.argsort(-exact, kind="stable")[:limit]
             
-            return [self._memory_to_dict(memory) for _, memory in top_memories]
+            return [self._memory_to_dict(memories[i]) for i in top]
             
         except Exception as e:
             logger.error(f"Error in semantic search: {e}")
@@ -235,27 +556,27 @@ class MemoryManager:
     ) -> List[Dict[str, Any]]:
         """Get memories related to a specific memory"""
         try:
-            db = await get_db_session()
-            
-            # Get the target memory
-            target_memory = db.query(UserMemory).filter(
-                and_(
-                    UserMemory.id == memory_id,
-                    UserMemory.user_id == user_id
-                )
-            ).first()
-            
-            if not target_memory or not target_memory.related_memories:
-                return []
-            
-            # Get related memories
-            related_ids = target_memory.related_memories
-            related_memories = db.query(UserMemory).filter(
+            # Expand the target memory's related IDs inside the query, so one round-trip
+            # fetches the related memories without loading the target first
+            target = aliased(UserMemory)
+            related_ids = select(
+                cast(func.json_array_elements_text(target.related_memories), Integer)
+            ).where(
                 and_(
-                    UserMemory.id.in_(related_ids),
-                    UserMemory.is_active == True
+                    target.id == memory_id,
+                    target.user_id == user_id
                 )
-            ).limit(limit).all()
+            )
+            async with db_session() as db:
+                related_memories = (await db.execute(
+                    select(UserMemory).options(_MEMORY_DICT_COLUMNS).where(
+                        and_(
+                            UserMemory.id.in_(related_ids),
+                            UserMemory.user_id == user_id,
+                            UserMemory.is_active == True
+                        )
+                    ).limit(limit)
+                )).scalars().all()
             
             return [self._memory_to_dict(memory) for memory in related_memories]
             
@@ -266,43 +587,52 @@ class MemoryManager:
     async def get_memory_summary(self, user_id: str, days: int = 30) -> Dict[str, Any]:
         """Get a comprehensive summary of user's memory"""
         try:
-            db = await get_db_session()
-            
             cutoff_date = datetime.utcnow() - timedelta(days=days)
+            recent_filter = and_(
+                UserMemory.user_id == user_id,
+                UserMemory.timestamp >= cutoff_date,
+                UserMemory.is_active == True
+            )
             
-            # Get memory counts by type
-            memory_counts = db.query(
+            # Per-type aggregates (as one JSON object) and the relationship count come back
+            # as a single row; top memories stay ORM rows for _memory_to_dict
+            by_type = select(
                 UserMemory.type,
                 func.count(UserMemory.id).label('count'),
                 func.avg(UserMemory.importance_score).label('avg_importance')
-            ).filter(
-                and_(
-                    UserMemory.user_id == user_id,
-                    UserMemory.timestamp >= cutoff_date,
-                    UserMemory.is_active == True
-                )
-            ).group_by(UserMemory.type).all()
-            
-            # Get top memories by importance
-            top_memories = db.query(UserMemory).filter(
-                and_(
-                    UserMemory.user_id == user_id,
-                    UserMemory.timestamp >= cutoff_date,
-                    UserMemory.is_active == True
+            ).where(recent_filter).group_by(UserMemory.type).subquery()
+            
+            stats, top_memories = await asyncio.gather(
+                _fetch_rows(
+                    select(
+                        select(
+                            func.json_object_agg(
+                                by_type.c.type,
+                                func.json_build_array(by_type.c.count, by_type.c.avg_importance)
+                            ).cast(JSON)
+                        ).scalar_subquery(),
+                        select(func.count(RelationshipGraph.id)).where(
+                            RelationshipGraph.user_id == user_id
+                        ).scalar_subquery()
+                    )
+                ),
+                _fetch_scalars(
+                    select(UserMemory).options(_MEMORY_DICT_COLUMNS).where(recent_filter)
+                    .order_by(desc(UserMemory.importance_score)).limit(10)
                 )
-            ).order_by(desc(UserMemory.importance_score)).limit(10).all()
-            
-            # Get relationship count
-            relationship_count = db.query(func.count(RelationshipGraph.id)).filter(
-                RelationshipGraph.user_id == user_id
-            ).scalar() or 0
+            )
+            memory_counts, relationship_count = stats[0]
+            memory_counts = memory_counts or {}
             
             return {
                 "period_days": days,
-                "total_memories": sum(count.count for count in memory_counts),
-                "memory_by_type": {count.type: {"count": count.count, "avg_importance": float(count.avg_importance or 0)} for count in memory_counts},
+                "total_memories": sum(count for count, _ in memory_counts.values()),
+                "memory_by_type": {
+                    memory_type: {"count": count, "avg_importance": float(avg_importance or 0)}
+                    for memory_type, (count, avg_importance) in memory_counts.items()
+                },
                 "top_memories": [self._memory_to_dict(memory) for memory in top_memories],
-                "relationship_count": relationship_count,
+                "relationship_count": relationship_count or 0,
                 "summary_generated": datetime.utcnow().isoformat()
             }
             
@@ -319,7 +649,8 @@ class MemoryManager:
                 recent_data = await self.redis_client.lrange(redis_key, 0, limit - 1)
                 
                 if recent_data:
-                    return [json.loads(data) for data in recent_data]
+                    # Entries are JSON objects; parse the whole slice as one array
+                    return json.loads("[" + ",".join(recent_data) + "]")
             
             # Fallback to database
             return await self.recall_memory(user_id, limit=limit, hours_back=24)
@@ -331,25 +662,16 @@ class MemoryManager:
     async def get_user_preferences(self, user_id: str) -> Dict[str, Any]:
         """Get user preferences and style profile"""
         try:
-            db = await get_db_session()
-            
-            # Get style profile
-            style_profile = db.query(UserStyleProfile).filter(
-                UserStyleProfile.user_id == user_id
-            ).first()
-            
-            # Get preferences
-            preferences = db.query(UserPreference).filter(
-                UserPreference.user_id == user_id
-            ).all()
-            
-            # Get habits
-            habits = db.query(UserHabit).filter(
-                and_(
-                    UserHabit.user_id == user_id,
-                    UserHabit.is_active == True
-                )
-            ).all()
+            params = {"user_id": user_id}
+            
+            # Style profile, preferences and habits are independent; run them concurrently,
+            # each on its own pooled session
+            style_profiles, preferences, habits = await asyncio.gather(
+                _fetch_scalars(_STYLE_PROFILE_STMT, params),
+                _fetch_scalars(_PREFERENCES_STMT, params),
+                _fetch_scalars(_ACTIVE_HABITS_STMT, params)
+            )
+            style_profile = style_profiles[0] if style_profiles else None
             
             result = {
                 "style_profile": self._style_profile_to_dict(style_profile) if style_profile else {},
@@ -433,28 +755,29 @@ class MemoryManager:
     async def forget_memory(self, user_id: str, memory_id: int) -> bool:
         """Forget a specific memory (soft delete)"""
         try:
-            db = await get_db_session()
-            
-            memory = db.query(UserMemory).filter(
-                and_(
-                    UserMemory.id == memory_id,
-                    UserMemory.user_id == user_id
-                )
-            ).first()
-            
-            if memory:
-                memory.is_active = False
-                await db.commit()
+            async with db_session() as db:
+                memory = (await db.execute(
+                    select(UserMemory).options(_MEMORY_DICT_COLUMNS).where(
+                        and_(
+                            UserMemory.id == memory_id,
+                            UserMemory.user_id == user_id
+                        )
+                    )
+                )).scalars().first()
                 
-                # Remove from Redis cache
-                if self.redis_client:
-                    redis_key = f"recent_context:{user_id}"
-                    await self.redis_client.lrem(redis_key, 0, json.dumps(self._memory_to_dict(memory)))
+                if not memory:
+                    return False
                 
-                logger.info(f"Memory {memory_id} forgotten for user {user_id}")
-                return True
+                memory.is_active = False
+                await db.commit()
             
-            return False
+            # Remove from Redis cache
+            if self.redis_client:
+                redis_key = f"recent_context:{user_id}"
+                await self.redis_client.lrem(redis_key, 0, json.dumps(self._memory_to_dict(memory)))
+            
+            logger.info(f"Memory {memory_id} forgotten for user {user_id}")
+            return True
             
         except Exception as e:
             logger.error(f"Error forgetting memory: {e}")
@@ -462,49 +785,93 @@ class MemoryManager:
     
     async def _generate_embedding(self, text: str) -> Optional[List[float]]:
         """Generate embedding for text using OpenAI"""
+        return (await self._generate_embeddings([text]))[0]
+    
+    async def _generate_embeddings(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """
+        Generate embeddings for several texts, reusing cached vectors for repeated content
+        
+        Texts not found in the Redis cache go to OpenAI in one request, deduplicated,
+        and their vectors are cached for EMBEDDING_CACHE_TTL seconds.
+        """
         try:
             if not self.openai_client:
-                return None
+                return [None] * len(texts)
             
-            response = await self.openai_client.embeddings.create(
-                model="text-embedding-3-small",
-                input=text
-            )
+            keys = [_embedding_cache_key(text) for text in texts]
+            embeddings = {}
             
-            return response.data[0].embedding
+            if self.redis_client:
+                try:
+                    cached = await self.redis_client.mget(keys)
+                    for key, value in zip(keys, cached):
+                        if value:
+                            embeddings[key] = _decode_cached_embedding(value)
+                except Exception as e:
+                    logger.warning(f"Embedding cache unavailable: {e}")
+            
+            missing = {key: text for key, text in zip(keys, texts) if key not in embeddings}
+            if missing:
+                response = await self.openai_client.embeddings.create(
+                    model=_EMBEDDING_MODEL,
+                    input=list(missing.values())
+                )
+                fresh = dict(zip(missing, (item.embedding for item in response.data)))
+                embeddings.update(fresh)
+                
+                if self.redis_client:
+                    try:
+                        async with self.redis_client.pipeline(transaction=False) as pipe:
+                            for key, embedding in fresh.items():
+                                pipe.set(key, _encode_cached_embedding(embedding), ex=EMBEDDING_CACHE_TTL)
+                            await pipe.execute()
+                    except Exception as e:
+                        logger.warning(f"Error caching embeddings: {e}")
+            
+            return [embeddings.get(key) for key in keys]
             
         except Exception as e:
-            logger.error(f"Error generating embedding: {e}")
-            return None
+            logger.error(f"Error generating embeddings: {e}")
+            return [None] * len(texts)
     
     async def _store_recent_context(
         self, 
         user_id: str, 
         memory_type: str, 
         content: str, 
-        memory_id: int
+        memory_id: int,
+        stored_at: Optional[datetime] = None
     ):
         """Store recent context in Redis for fast access"""
+        await self._store_recent_contexts([(user_id, memory_type, content, memory_id)], stored_at)
+    
+    async def _store_recent_contexts(self, entries: List[tuple], stored_at: Optional[datetime] = None):
+        """Store (user_id, memory_type, content, memory_id) entries in Redis in one round-trip"""
         try:
-            if not self.redis_client:
+            if not self.redis_client or not entries:
                 return
             
-            redis_key = f"recent_context:{user_id}"
-            context_data = {
-                "id": memory_id,
-                "type": memory_type,
-                "content": content[:200],  # Truncate for Redis
-                "timestamp": datetime.utcnow().isoformat()
-            }
-            
-            # Add to list (newest first)
-            await self.redis_client.lpush(redis_key, json.dumps(context_data))
-            
-            # Keep only last MAX_CONTEXT_ITEMS
-            await self.redis_client.ltrim(redis_key, 0, MAX_CONTEXT_ITEMS - 1)
-            
-            # Set expiration
-            await self.redis_client.expire(redis_key, CACHE_TTL)
+            timestamp = (stored_at or datetime.now(timezone.utc)).isoformat(timespec="seconds")
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                for user_id, memory_type, content, memory_id in entries:
+                    redis_key = f"recent_context:{user_id}"
+                    context_data = {
+                        "id": memory_id,
+                        "type": memory_type,
+                        "content": content[:200],  # Truncate for Redis
+                        "timestamp": timestamp
+                    }
+                    
+                    # Add to list (newest first)
+                    pipe.lpush(redis_key, _encode_context(context_data))
+                    
+                    # Keep only last MAX_CONTEXT_ITEMS
+                    pipe.ltrim(redis_key, 0, MAX_CONTEXT_ITEMS - 1)
+                    
+                    # Set expiration
+                    pipe.expire(redis_key, CACHE_TTL)
+                
+                await pipe.execute()
             
         except Exception as e:
             logger.error(f"Error storing recent context in Redis: {e}")
@@ -513,62 +880,85 @@ class MemoryManager:
         self, 
         user_id: str, 
         memory_id: int, 
-        related_memory_ids: List[int]
+        related_memory_ids: List[int],
+        db: Optional[AsyncSession] = None
     ):
         """Update relationship graph when new memories are added"""
         try:
-            db = await get_db_session()
-            
-            for related_id in related_memory_ids:
-                # Create bidirectional relationship
-                relationship = RelationshipGraph(
-                    user_id=user_id,
-                    entity1_type="memory",
-                    entity1_id=str(memory_id),
-                    entity2_type="memory",
-                    entity2_id=str(related_id),
-                    relationship_type="related_to",
-                    strength=0.8,
-                    context={"source": "memory_creation"}
-                )
-                db.add(relationship)
-            
-            await db.commit()
+            owns_session = db is None
+            if owns_session:
+                db = await get_db_session()
+            
+            # Create bidirectional relationships in one multi-row INSERT; a savepoint keeps
+            # a failure here from aborting the caller's transaction
+            async with db.begin_nested():
+                await db.execute(insert(RelationshipGraph), [
+                    {
+                        "user_id": user_id,
+                        "entity1_type": "memory",
+                        "entity1_id": str(memory_id),
+                        "entity2_type": "memory",
+                        "entity2_id": str(related_id),
+                        "relationship_type": "related_to",
+                        "strength": 0.8,
+                        "context": {"source": "memory_creation"}
+                    }
+                    for related_id in related_memory_ids
+                ])
+            
+            if owns_session:
+                await db.commit()
             
         except Exception as e:
             logger.error(f"Error updating relationship graph: {e}")
     
-    async def _schedule_smart_reminder(self, user_id: int, memory_id: int, content: str, importance_score: float):
+    def _schedule_smart_reminder(
+        self,
+        db: AsyncSession,
+        user_id: int,
+        memory_id: int,
+        content: str,
+        importance_score: float,
+        now: datetime
+    ):
         """
         Schedule a smart reminder based on urgency analysis and user context
         
+        Adds the memory_reminder task to db, so it commits with the memory
+        
         Args:
+            db: Session the memory is being stored on
             user_id: User identifier
             memory_id: Memory ID to remind about
             content: Memory content for analysis
             importance_score: Importance score for timing
+            now: Time the memory was stored
         """
-        try:
-            # Analyze urgency and context
-            urgency_level = await self._analyze_urgency(content, importance_score)
-            reminder_hours = await self._calculate_reminder_timing(urgency_level, content)
-            
-            # Schedule the reminder
-            from services.proactive_agent import proactive_agent
-            await proactive_agent.schedule_memory_reminder(
-                user_id=user_id,
-                memory_id=memory_id,
-                content=content,
-                hours_from_now=reminder_hours,
-                urgency_level=urgency_level
-            )
-            
-            logger.info(f"Scheduled smart reminder for user {user_id}, memory {memory_id} in {reminder_hours} hours")
-            
-        except Exception as e:
-            logger.error(f"Error scheduling smart reminder: {e}")
+        # Analyze urgency and context
+        urgency_level = self._analyze_urgency(content, importance_score)
+        reminder_hours = self._calculate_reminder_timing(urgency_level, content)
+        reminder_time = now + timedelta(hours=reminder_hours)
+        
+        # Queue the task the proactive agent's scheduler picks up
+        db.add(ProactiveTask(
+            user_id=user_id,
+            task_type="memory_reminder",
+            task_data={
+                "type": "memory_reminder",
+                "user_id": user_id,
+                "memory_id": memory_id,
+                "content": content,
+                "urgency_level": urgency_level,
+                "scheduled_time": reminder_time.isoformat(),
+                "status": "scheduled"
+            },
+            scheduled_time=reminder_time,
+            priority=_URGENCY_PRIORITY[urgency_level]
+        ))
+        
+        logger.info(f"Scheduled smart reminder for user {user_id}, memory {memory_id} in {reminder_hours} hours")
 
-    async def _analyze_urgency(self, content: str, importance_score: float) -> str:
+    def _analyze_urgency(self, content: str, importance_score: float) -> str:
         """
         Analyze the urgency level of a memory based on content and importance
         
@@ -576,24 +966,10 @@ class MemoryManager:
             urgency_level: "critical", "high", "medium", "low"
         """
         try:
-            # Keywords that indicate urgency
-            critical_keywords = ["urgent", "emergency", "asap", "immediately", "now", "critical", "deadline", "due today"]
-            high_keywords = ["important", "soon", "today", "this afternoon", "this evening", "priority"]
-            medium_keywords = ["tomorrow", "this week", "soon", "when you can", "sometime"]
-            
-            content_lower = content.lower()
-            
-            # Check for critical urgency
-            if any(keyword in content_lower for keyword in critical_keywords):
-                return "critical"
-            
-            # Check for high urgency
-            if any(keyword in content_lower for keyword in high_keywords):
-                return "high"
-            
-            # Check for medium urgency
-            if any(keyword in content_lower for keyword in medium_keywords):
-                return "medium"
+            # Most urgent keyword tier present, found in one scan
+            ranks = [_URGENCY_KEYWORDS[match.group(1)] for match in _URGENCY_RE.finditer(content.lower())]
+            if ranks:
+                return _URGENCY_LEVELS[min(ranks)]
             
             # Default based on importance score
             if importance_score >= 0.8:
@@ -607,7 +983,7 @@ class MemoryManager:
             logger.error(f"Error analyzing urgency: {e}")
             return "medium"
 
-    async def _calculate_reminder_timing(self, urgency_level: str, content: str) -> int:
+    def _calculate_reminder_timing(self, urgency_level: str, content: str) -> int:
         """
         Calculate when to send the reminder based on urgency level
         
@@ -625,22 +1001,11 @@ class MemoryManager:
             
             hours = base_timing.get(urgency_level, 6)
             
-            # Adjust based on time-sensitive keywords
-            content_lower = content.lower()
-            
-            # Time-specific adjustments
-            if "morning" in content_lower or "breakfast" in content_lower:
-                hours = max(1, hours - 2)  # Earlier for morning tasks
-            elif "evening" in content_lower or "dinner" in content_lower:
-                hours = min(24, hours + 2)  # Later for evening tasks
-            elif "tomorrow" in content_lower:
-                hours = 24  # Tomorrow = 24 hours
-            elif "next week" in content_lower:
-                hours = 168  # Next week = 7 days
-            elif "this afternoon" in content_lower:
-                hours = 4   # This afternoon = 4 hours
-            elif "tonight" in content_lower:
-                hours = 8   # Tonight = 8 hours
+            # Time-specific adjustments; the first rule in _TIMING_RULES that matches wins
+            rules = [_TIMING_KEYWORDS[match.group(1)] for match in _TIMING_RE.finditer(content.lower())]
+            if rules:
+                adjust = _TIMING_RULES[min(rules)][1]
+                hours = adjust(hours)
             
             return hours
             
@@ -648,61 +1013,46 @@ class MemoryManager:
             logger.error(f"Error calculating reminder timing: {e}")
             return 6  # Default to 6 hours
 
-    async def _update_importance_scores(self, user_id: str, memory_id: int):
+    async def _update_importance_scores(self, user_id: str, memory_id: int, db: Optional[AsyncSession] = None):
         """Update importance scores based on relationships"""
         try:
-            db = await get_db_session()
+            owns_session = db is None
+            if owns_session:
+                db = await get_db_session()
             
-            # Get relationships for this memory
-            relationships = db.query(RelationshipGraph).filter(
-                or_(
-                    and_(
-                        RelationshipGraph.user_id == user_id,
-                        RelationshipGraph.entity1_id == str(memory_id)
-                    ),
-                    and_(
-                        RelationshipGraph.user_id == user_id,
+            # Boost importance by 0.1 per relationship (capped at 0.3) in one statement
+            relationship_count = select(func.count()).where(
+                and_(
+                    RelationshipGraph.user_id == user_id,
+                    or_(
+                        RelationshipGraph.entity1_id == str(memory_id),
                         RelationshipGraph.entity2_id == str(memory_id)
                     )
                 )
-            ).all()
-            
-            if relationships:
-                # Increase importance based on number of relationships
-                importance_boost = min(0.3, len(relationships) * 0.1)
-                
-                memory = db.query(UserMemory).filter(
-                    and_(
-                        UserMemory.id == memory_id,
-                        UserMemory.user_id == user_id
+            ).scalar_subquery()
+            
+            async with db.begin_nested():
+                await db.execute(
+                    update(UserMemory)
+                    .where(
+                        and_(
+                            UserMemory.id == memory_id,
+                            UserMemory.user_id == user_id
+                        )
                     )
-                ).first()
-                
-                if memory:
-                    memory.importance_score = min(1.0, memory.importance_score + importance_boost)
-                    await db.commit()
-            
-        except Exception as e:
-            logger.error(f"Error updating importance scores: {e}")
-    
-    def _cosine_similarity(self, vec1: List[float], vec2: List[float]) -> float:
-        """Calculate cosine similarity between two vectors"""
-        try:
-            if len(vec1) != len(vec2):
-                return 0.0
-            
-            dot_product = sum(a * b for a, b in zip(vec1, vec2))
-            norm1 = sum(a * a for a in vec1) ** 0.5
-            norm2 = sum(b * b for b in vec2) ** 0.5
-            
-            if norm1 == 0 or norm2 == 0:
-                return 0.0
+                    .values(
+                        importance_score=func.least(
+                            1.0,
+                            UserMemory.importance_score + func.least(0.3, relationship_count * 0.1)
+                        )
+                    )
+                )
             
-            return dot_product / (norm1 * norm2)
+            if owns_session:
+                await db.commit()
             
         except Exception as e:
-            logger.error(f"Error calculating cosine similarity: {e}")
-            return 0.0
+            logger.error(f"Error updating importance scores: {e}")
     
     def _memory_to_dict(self, memory: UserMemory) -> Dict[str, Any]:
         """Convert memory object to dictionary"""
@@ -734,20 +1084,17 @@ class MemoryManager:
     
     def _habit_to_dict(self, habit: UserHabit) -> Dict[str, Any]:
         """Convert habit to dictionary"""
+        last_observed, next_predicted = habit.iso_timestamps()
         return {
             "id": habit.id,
             "pattern_type": habit.pattern_type,
             "pattern_data": habit.pattern_data,
             "confidence": habit.confidence,
-            "last_observed": habit.last_observed.isoformat() if habit.last_observed else None,
+            "last_observed": last_observed,
             "observation_count": habit.observation_count,
-            "next_predicted": habit.next_predicted.isoformat() if habit.next_predicted else None,
+            "next_predicted": next_predicted,
             "proactive_suggestions": habit.proactive_suggestions or []
         }
-    
-    def _get_current_timestamp(self) -> datetime:
-        """Get current timestamp in UTC"""
-        return datetime.utcnow()
 
 
 # Global memory manager instance
@@ -3,6 +3,7 @@ OAuth Service for Jarvis Phone AI Assistant
 Handles Gmail and Calendar OAuth integration setup
 """
 
+import asyncio
 import logging
 import json
 from typing import Dict, Any, Optional, List
@@ -10,13 +11,100 @@ from datetime import datetime, timedelta
 from dataclasses import dataclass
 from enum import Enum
 
+import httpx
+
 from config import settings
 from telephony.twilio_handler import TwilioHandler
 from telephony.telnyx_handler import TelnyxHandler
 from config import get_telephony_provider, is_twilio_enabled
+from utils.constants import (
+    OAUTH_HTTP_TIMEOUT, OAUTH_HTTP_MAX_CONNECTIONS, OAUTH_HTTP_MAX_KEEPALIVE,
+    OAUTH_INTEGRATION_CACHE_TTL, OAUTH_INTEGRATION_CACHE_SIZE, OAUTH_REFRESH_SKEW_SECONDS
+)
 
 logger = logging.getLogger(__name__)
 
+# One pooled client for all Google OAuth calls, so keep-alive connections skip
+# a fresh TCP+TLS handshake per request
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def _shared_http_client() -> httpx.AsyncClient:
+    """Build the process-wide OAuth HTTP client on first use"""
+    global _http_client
+    if _http_client is None:
+        _http_client = httpx.AsyncClient(
+            timeout=OAUTH_HTTP_TIMEOUT,
+            limits=httpx.Limits(
+                max_keepalive_connections=OAUTH_HTTP_MAX_KEEPALIVE,
+                max_connections=OAUTH_HTTP_MAX_CONNECTIONS
+            )
+        )
+    return _http_client
+
+
+async def close_http_client():
+    """Close the shared OAuth HTTP client, if one was created"""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+# Integration lookups, shared across the per-request OAuthService instances:
+# (user_id, provider) -> (integration, fetched_at) and user_id -> (integrations, fetched_at)
+_integration_cache: Dict[tuple, tuple] = {}
+_user_integrations_cache: Dict[int, tuple] = {}
+
+
+def _cache_get(cache: Dict, key) -> Any:
+    """Return a cached value younger than OAUTH_INTEGRATION_CACHE_TTL, else None"""
+    cached = cache.get(key)
+    if cached:
+        value, fetched_at = cached
+        if (datetime.utcnow() - fetched_at).total_seconds() < OAUTH_INTEGRATION_CACHE_TTL:
+            return value
+    return None
+
+
+def _cache_put(cache: Dict, key, value):
+    """Cache a value, evicting the oldest entry once OAUTH_INTEGRATION_CACHE_SIZE is reached"""
+    cache.pop(key, None)
+    if len(cache) >= OAUTH_INTEGRATION_CACHE_SIZE:
+        cache.pop(next(iter(cache)))
+    cache[key] = (value, datetime.utcnow())
+
+
+# In-flight Google calls, so concurrent duplicates await one shared result:
+# user_id -> token refresh task, authorization_code -> code exchange task
+_refresh_inflight: Dict[int, asyncio.Task] = {}
+_exchange_inflight: Dict[str, asyncio.Task] = {}
+
+# Connected tokens this close to expiry are refreshed when their status is read
+_REFRESH_SKEW = timedelta(seconds=OAUTH_REFRESH_SKEW_SECONDS)
+
+
+def _start_single_flight(inflight: Dict, key, make_coro) -> asyncio.Task:
+    """Return the task running for key, starting make_coro() if there is none"""
+    task = inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(make_coro())
+        inflight[key] = task
+        
+        def _forget(done: asyncio.Task):
+            if inflight.get(key) is done:
+                del inflight[key]
+        
+        task.add_done_callback(_forget)
+    
+    return task
+
+
+async def _single_flight(inflight: Dict, key, make_coro):
+    """Run make_coro() once per key at a time; callers arriving meanwhile share its result"""
+    # Shield so one caller being cancelled doesn't cancel the call the others await
+    return await asyncio.shield(_start_single_flight(inflight, key, make_coro))
+
 
 class OAuthProvider(Enum):
     """OAuth providers"""
@@ -133,8 +221,13 @@ class OAuthService:
         try:
             logger.info(f"Handling Google OAuth callback for user {user_id}")
             
-            # Exchange authorization code for access token
-            token_response = await self._exchange_google_code(authorization_code)
+            # Exchange authorization code for access token; a redelivered callback
+            # shares the exchange already in flight for its code
+            token_response = await _single_flight(
+                _exchange_inflight,
+                authorization_code,
+                lambda: self._exchange_google_code(authorization_code)
+            )
             
             if not token_response.get('success'):
                 return token_response
@@ -180,7 +273,11 @@ class OAuthService:
             }
     
     async def refresh_google_tokens(self, user_id: int) -> Dict[str, Any]:
-        """Refresh expired Google access tokens"""
+        """Refresh expired Google access tokens; concurrent calls for a user share one refresh"""
+        return await _single_flight(_refresh_inflight, user_id, lambda: self._refresh_user_google_tokens(user_id))
+    
+    async def _refresh_user_google_tokens(self, user_id: int) -> Dict[str, Any]:
+        """Refresh a user's Google access tokens and store them"""
         try:
             integration = await self._get_oauth_integration(user_id, OAuthProvider.GOOGLE)
             
@@ -197,6 +294,7 @@ class OAuthService:
                 return token_response
             
             # Update integration with new tokens
+            integration.status = OAuthStatus.CONNECTED
             integration.access_token = token_response['access_token']
             integration.expires_at = datetime.utcnow() + timedelta(seconds=token_response['expires_in'])
             integration.updated_at = datetime.utcnow()
@@ -222,36 +320,35 @@ class OAuthService:
         """Get OAuth integration status for a user"""
         try:
             integrations = await self._get_user_oauth_integrations(user_id)
-            
-            status_summary = {}
-            
-            for provider in OAuthProvider:
-                integration = next(
-                    (i for i in integrations if i.provider == provider), 
-                    None
-                )
-                
-                if integration:
+            by_provider = {integration.provider: integration for integration in integrations}
+            
+            now = datetime.utcnow()
+            expired = []
+            for provider, integration in by_provider.items():
+                if (integration.expires_at and 
+                    integration.expires_at - now < _REFRESH_SKEW and 
+                    integration.status == OAuthStatus.CONNECTED):
+                    # Refresh in the background ahead of expiry; repeat reads join the same refresh
+                    if provider == OAuthProvider.GOOGLE and integration.refresh_token:
+                        _start_single_flight(
+                            _refresh_inflight,
+                            user_id,
+                            lambda: self._refresh_user_google_tokens(user_id)
+                        )
+                    
                     # Check if token is expired
-                    if (integration.expires_at and 
-                        integration.expires_at < datetime.utcnow() and 
-                        integration.status == OAuthStatus.CONNECTED):
+                    if integration.expires_at < now:
                         integration.status = OAuthStatus.EXPIRED
-                        await self._store_oauth_integration(integration)
-                    
-                    status_summary[provider.value] = {
-                        "status": integration.status.value,
-                        "connected": integration.status == OAuthStatus.CONNECTED,
-                        "expires_at": integration.expires_at.isoformat() if integration.expires_at else None,
-                        "user_email": integration.user_email
-                    }
-                else:
-                    status_summary[provider.value] = {
-                        "status": OAuthStatus.NOT_CONNECTED.value,
-                        "connected": False,
-                        "expires_at": None,
-                        "user_email": None
-                    }
+                        expired.append(integration)
+            
+            # Persist expiry marks concurrently rather than one after another
+            if expired:
+                await asyncio.gather(*(self._store_oauth_integration(integration) for integration in expired))
+            
+            status_summary = {
+                provider.value: self._integration_status(by_provider.get(provider))
+                for provider in OAuthProvider
+            }
             
             return {
                 "user_id": user_id,
@@ -262,6 +359,23 @@ class OAuthService:
             logger.error(f"Error getting OAuth status: {e}")
             return {"error": str(e)}
     
+    def _integration_status(self, integration: Optional[OAuthIntegration]) -> Dict[str, Any]:
+        """Summarize one provider's integration for get_oauth_status"""
+        if not integration:
+            return {
+                "status": OAuthStatus.NOT_CONNECTED.value,
+                "connected": False,
+                "expires_at": None,
+                "user_email": None
+            }
+        
+        return {
+            "status": integration.status.value,
+            "connected": integration.status == OAuthStatus.CONNECTED,
+            "expires_at": integration.expires_at.isoformat() if integration.expires_at else None,
+            "user_email": integration.user_email
+        }
+    
     async def revoke_oauth_integration(
         self, 
         user_id: int, 
@@ -356,8 +470,6 @@ class OAuthService:
     async def _exchange_google_code(self, authorization_code: str) -> Dict[str, Any]:
         """Exchange authorization code for access tokens"""
         try:
-            import httpx
-            
             # Token exchange endpoint
             token_url = "https://oauth2.googleapis.com/token"
             
@@ -371,25 +483,25 @@ class OAuthService:
             }
             
             # Make request
-            async with httpx.AsyncClient() as client:
-                response = await client.post(token_url, data=data)
+            client = _shared_http_client()
+            response = await client.post(token_url, data=data)
+            
+            if response.status_code == 200:
+                token_data = response.json()
+                
+                return {
+                    "success": True,
+                    "access_token": token_data['access_token'],
+                    "refresh_token": token_data.get('refresh_token'),
+                    "expires_in": token_data.get('expires_in', 3600)
+                }
+            else:
+                logger.error(f"Google token exchange failed: {response.text}")
+                return {
+                    "success": False,
+                    "error": "Token exchange failed"
+                }
                 
-                if response.status_code == 200:
-                    token_data = response.json()
-                    
-                    return {
-                        "success": True,
-                        "access_token": token_data['access_token'],
-                        "refresh_token": token_data.get('refresh_token'),
-                        "expires_in": token_data.get('expires_in', 3600)
-                    }
-                else:
-                    logger.error(f"Google token exchange failed: {response.text}")
-                    return {
-                        "success": False,
-                        "error": "Token exchange failed"
-                    }
-                    
         except Exception as e:
             logger.error(f"Error exchanging Google code: {e}")
             return {
@@ -400,32 +512,30 @@ class OAuthService:
     async def _get_google_user_info(self, access_token: str) -> Dict[str, Any]:
         """Get user information from Google"""
         try:
-            import httpx
-            
             # User info endpoint
             userinfo_url = "https://www.googleapis.com/oauth2/v2/userinfo"
             
             headers = {'Authorization': f'Bearer {access_token}'}
             
-            async with httpx.AsyncClient() as client:
-                response = await client.get(userinfo_url, headers=headers)
+            client = _shared_http_client()
+            response = await client.get(userinfo_url, headers=headers)
+            
+            if response.status_code == 200:
+                user_data = response.json()
+                
+                return {
+                    "success": True,
+                    "email": user_data.get('email'),
+                    "name": user_data.get('name'),
+                    "picture": user_data.get('picture')
+                }
+            else:
+                logger.error(f"Google user info failed: {response.text}")
+                return {
+                    "success": False,
+                    "error": "Failed to get user info"
+                }
                 
-                if response.status_code == 200:
-                    user_data = response.json()
-                    
-                    return {
-                        "success": True,
-                        "email": user_data.get('email'),
-                        "name": user_data.get('name'),
-                        "picture": user_data.get('picture')
-                    }
-                else:
-                    logger.error(f"Google user info failed: {response.text}")
-                    return {
-                        "success": False,
-                        "error": "Failed to get user info"
-                    }
-                    
         except Exception as e:
             logger.error(f"Error getting Google user info: {e}")
             return {
@@ -436,8 +546,6 @@ class OAuthService:
     async def _refresh_google_tokens(self, refresh_token: str) -> Dict[str, Any]:
         """Refresh Google access tokens"""
         try:
-            import httpx
-            
             # Token refresh endpoint
             token_url = "https://oauth2.googleapis.com/token"
             
@@ -450,24 +558,24 @@ class OAuthService:
             }
             
             # Make request
-            async with httpx.AsyncClient() as client:
-                response = await client.post(token_url, data=data)
+            client = _shared_http_client()
+            response = await client.post(token_url, data=data)
+            
+            if response.status_code == 200:
+                token_data = response.json()
+                
+                return {
+                    "success": True,
+                    "access_token": token_data['access_token'],
+                    "expires_in": token_data.get('expires_in', 3600)
+                }
+            else:
+                logger.error(f"Google token refresh failed: {response.text}")
+                return {
+                    "success": False,
+                    "error": "Token refresh failed"
+                }
                 
-                if response.status_code == 200:
-                    token_data = response.json()
-                    
-                    return {
-                        "success": True,
-                        "access_token": token_data['access_token'],
-                        "expires_in": token_data.get('expires_in', 3600)
-                    }
-                else:
-                    logger.error(f"Google token refresh failed: {response.text}")
-                    return {
-                        "success": False,
-                        "error": "Token refresh failed"
-                    }
-                    
         except Exception as e:
             logger.error(f"Error refreshing Google tokens: {e}")
             return {
@@ -478,27 +586,29 @@ class OAuthService:
     async def _revoke_google_tokens(self, access_token: str):
         """Revoke Google access tokens"""
         try:
-            import httpx
-            
             # Token revocation endpoint
             revoke_url = "https://oauth2.googleapis.com/revoke"
             
             data = {'token': access_token}
             
-            async with httpx.AsyncClient() as client:
-                response = await client.post(revoke_url, data=data)
+            client = _shared_http_client()
+            response = await client.post(revoke_url, data=data)
+            
+            if response.status_code == 200:
+                logger.info("Google tokens revoked successfully")
+            else:
+                logger.warning(f"Google token revocation failed: {response.text}")
                 
-                if response.status_code == 200:
-                    logger.info("Google tokens revoked successfully")
-                else:
-                    logger.warning(f"Google token revocation failed: {response.text}")
-                    
         except Exception as e:
             logger.error(f"Error revoking Google tokens: {e}")
     
     async def _store_oauth_integration(self, integration: OAuthIntegration):
         """Store OAuth integration in database"""
         try:
+            # Drop cached lookups so the next read sees this write
+            _integration_cache.pop((integration.user_id, integration.provider), None)
+            _user_integrations_cache.pop(integration.user_id, None)
+            
             # This would save to an oauth_integrations table
             # For now, just log it
             logger.debug(f"Storing OAuth integration: {integration.provider.value} for user {integration.user_id}")
@@ -511,7 +621,25 @@ class OAuthService:
         user_id: int, 
         provider: OAuthProvider
     ) -> Optional[OAuthIntegration]:
-        """Get OAuth integration for a user and provider"""
+        """Get OAuth integration for a user and provider, cached for OAUTH_INTEGRATION_CACHE_TTL seconds"""
+        cached = _cache_get(_integration_cache, (user_id, provider))
+        if cached:
+            return cached
+        
+        integration = await self._fetch_oauth_integration(user_id, provider)
+        
+        # Only cache found integrations so a lookup error isn't remembered
+        if integration:
+            _cache_put(_integration_cache, (user_id, provider), integration)
+        
+        return integration
+    
+    async def _fetch_oauth_integration(
+        self, 
+        user_id: int, 
+        provider: OAuthProvider
+    ) -> Optional[OAuthIntegration]:
+        """Load OAuth integration for a user and provider from the database"""
         try:
             # This would query the oauth_integrations table
             # For now, return None
@@ -522,7 +650,20 @@ class OAuthService:
             return None
     
     async def _get_user_oauth_integrations(self, user_id: int) -> List[OAuthIntegration]:
-        """Get all OAuth integrations for a user"""
+        """Get all OAuth integrations for a user, cached for OAUTH_INTEGRATION_CACHE_TTL seconds"""
+        cached = _cache_get(_user_integrations_cache, user_id)
+        if cached:
+            return cached
+        
+        integrations = await self._fetch_user_oauth_integrations(user_id)
+        
+        if integrations:
+            _cache_put(_user_integrations_cache, user_id, integrations)
+        
+        return integrations
+    
+    async def _fetch_user_oauth_integrations(self, user_id: int) -> List[OAuthIntegration]:
+        """Load all OAuth integrations for a user from the database"""
         try:
             # This would query the oauth_integrations table
             # For now, return empty list
@@ -6,8 +6,13 @@ Tests all critical paths: SMS, voice, memory, proactive, confirmation
 import pytest
 import asyncio
 import json
+import os
 from datetime import datetime, timedelta
 from typing import Dict, Any, List
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
 # Import the modules we're testing
 from ai_orchestrator import AIOrchestrator
@@ -22,6 +27,51 @@ from telephony.telnyx_handler import TelnyxHandler
 from telephony.outbound_call_service import OutboundCallService
 
 
+@pytest.fixture
+async def postgres_engine():
+    """Async engine for the Postgres named by TEST_DATABASE_URL; skips when unset"""
+    database_url = os.getenv("TEST_DATABASE_URL")
+    if not database_url:
+        pytest.skip("TEST_DATABASE_URL not set")
+    
+    engine = create_async_engine(database_url.replace("postgresql://", "postgresql+asyncpg://"))
+    yield engine
+    await engine.dispose()
+
+
+@pytest.fixture
+async def sqlite_sessions(tmp_path, monkeypatch):
+    """Point get_db() at a fresh SQLite database with the full schema; yields its session factory"""
+    import db.database as database
+    import db.models  # noqa: F401 - registers every table on Base.metadata
+    
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'pluto.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(database.Base.metadata.create_all)
+    
+    sessions = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    monkeypatch.setattr(database, "AsyncSessionLocal", sessions)
+    yield sessions
+    await engine.dispose()
+
+
+@pytest.fixture
+async def postgres_sessions(postgres_engine, monkeypatch):
+    """Point get_db() at the test Postgres with the full schema; yields its session factory"""
+    import db.database as database
+    import db.models  # noqa: F401 - registers every table on Base.metadata
+    
+    async with postgres_engine.begin() as conn:
+        await conn.run_sync(database.Base.metadata.create_all)
+    
+    sessions = async_sessionmaker(postgres_engine, class_=AsyncSession, expire_on_commit=False)
+    monkeypatch.setattr(database, "AsyncSessionLocal", sessions)
+    yield sessions
+    
+    async with postgres_engine.begin() as conn:
+        await conn.run_sync(database.Base.metadata.drop_all)
+
+
 class TestSMSFlow:
     """Test SMS message processing flow"""
     
@@ -180,6 +230,138 @@ class TestMemoryManagement:
         # Now forget it
         result = await memory_manager.forget_memory("test_user", memory_id)
         assert result is True
+    
+    @pytest.mark.asyncio
+    async def test_memory_projection(self, memory_manager, sqlite_sessions):
+        """Test the habit projection returns recent active (type, content, timestamp, id) rows, newest first"""
+        from db.models import UserMemory
+        
+        now = datetime.utcnow()
+        async with sqlite_sessions() as db:
+            db.add_all([
+                UserMemory(user_id=1, type="sms", content="oldest", timestamp=now - timedelta(hours=3)),
+                UserMemory(user_id=1, type="reminder", content="newest", timestamp=now - timedelta(hours=1)),
+                UserMemory(user_id=1, type="sms", content="middle", timestamp=now - timedelta(hours=2)),
+                UserMemory(user_id=1, type="sms", content="too old", timestamp=now - timedelta(hours=48)),
+                UserMemory(user_id=1, type="sms", content="forgotten", timestamp=now - timedelta(hours=1), is_active=False),
+                UserMemory(user_id=2, type="sms", content="other user", timestamp=now - timedelta(hours=1))
+            ])
+            await db.commit()
+        
+        rows = await memory_manager.recall_memory_projection(user_id=1, hours_back=24, limit=10)
+        assert [(memory_type, content) for memory_type, content, _, _ in rows] == [
+            ("reminder", "newest"), ("sms", "middle"), ("sms", "oldest")
+        ]
+        assert all(isinstance(timestamp, datetime) for _, _, timestamp, _ in rows)
+        assert all(isinstance(memory_id, int) for _, _, _, memory_id in rows)
+        
+        rows = await memory_manager.recall_memory_projection(user_id=1, hours_back=24, limit=2)
+        assert [content for _, content, _, _ in rows] == ["newest", "middle"]
+
+    def test_embedding_encoding_round_trip(self):
+        """Test embeddings are stored as unit-length big-endian float32 bytes"""
+        import numpy as np
+        from services.memory_manager import _encode_embedding
+
+        embedding = [3.0, -4.0, 0.0, 12.0]
+        encoded = _encode_embedding(embedding)
+
+        assert len(encoded) == len(embedding) * 4
+        decoded = np.frombuffer(encoded, dtype=">f4")
+        np.testing.assert_allclose(decoded, np.array(embedding) / 13.0, rtol=1e-6)
+        assert encoded == (np.array(embedding) / 13.0).astype(">f4").tobytes()
+        assert _encode_embedding(None) is None
+        assert _encode_embedding([]) is None
+
+    @pytest.mark.parametrize("content,importance_score,expected", [
+        ("URGENT: call the bank", 0.1, "critical"),
+        ("this is important", 0.1, "high"),
+        ("pick up parcel tomorrow", 0.1, "medium"),
+        ("important, but due today", 0.1, "critical"),  # Most urgent tier wins
+        ("reply soon", 0.1, "high"),  # Listed in two tiers; the earlier one counts
+        ("buy milk", 0.9, "high"),  # No keywords: fall back to importance
+        ("buy milk", 0.5, "medium"),
+        ("buy milk", 0.2, "low")
+    ])
+    def test_analyze_urgency(self, memory_manager, content, importance_score, expected):
+        """Test urgency comes from the most urgent keyword tier, else the importance score"""
+        assert memory_manager._analyze_urgency(content, importance_score) == expected
+
+    @pytest.mark.parametrize("urgency_level,content,expected", [
+        ("critical", "call back", 1),
+        ("high", "call back", 3),
+        ("low", "call back", 12),
+        ("unknown", "call back", 6),
+        ("medium", "breakfast with sam", 4),
+        ("critical", "morning run", 1),  # Never earlier than an hour
+        ("low", "dinner plans", 14),
+        ("low", "evening walk", 14),
+        ("medium", "dentist tomorrow", 24),
+        ("medium", "report next week", 168),
+        ("low", "this afternoon", 4),
+        ("critical", "tonight", 8),
+        ("medium", "tomorrow morning", 4)  # Earlier rules take precedence
+    ])
+    def test_calculate_reminder_timing(self, memory_manager, urgency_level, content, expected):
+        """Test reminder delay is the urgency's base timing adjusted by the first matching time rule"""
+        assert memory_manager._calculate_reminder_timing(urgency_level, content) == expected
+
+    @pytest.mark.asyncio
+    async def test_semantic_search_ranks_stored_embeddings(self, memory_manager, sqlite_sessions, monkeypatch):
+        """Test semantic search ranks int8-quantized and legacy float32-only rows together"""
+        from db.models import UserMemory
+        from services.memory_manager import _encode_embedding, _quantize_embedding
+
+        async def query_embedding(text):
+            return [1.0, 0.0, 0.0, 0.0]
+        monkeypatch.setattr(memory_manager, "_generate_embedding", query_embedding)
+
+        def stored(content, vector, quantized=True, hours_ago=1):
+            return UserMemory(
+                user_id=1, type="sms", content=content,
+                timestamp=datetime.utcnow() - timedelta(hours=hours_ago),
+                embedding=_encode_embedding(vector),
+                embedding_i8=_quantize_embedding(vector) if quantized else None
+            )
+
+        async with sqlite_sessions() as db:
+            db.add_all([
+                stored("orthogonal", [0.0, 1.0, 0.0, 0.0], hours_ago=1),
+                stored("close legacy", [0.9, 0.2, 0.0, 0.0], quantized=False, hours_ago=2),
+                stored("exact", [2.0, 0.0, 0.0, 0.0], hours_ago=3),
+                stored("opposite legacy", [-1.0, 0.0, 0.0, 0.0], quantized=False, hours_ago=4),
+                stored("wrong dimension", [1.0, 0.0, 0.0], hours_ago=5)
+            ])
+            await db.commit()
+
+        results = await memory_manager._semantic_search(user_id=1, query="anything", limit=10)
+        assert [memory["content"] for memory in results] == [
+            "exact", "close legacy", "orthogonal", "opposite legacy"
+        ]
+
+        results = await memory_manager._semantic_search(user_id=1, query="anything", limit=2)
+        assert [memory["content"] for memory in results] == ["exact", "close legacy"]
+
+    def test_embedding_quantization_round_trip(self):
+        """Test int8 copies scale the largest component to 127 and keep the vector's direction"""
+        import numpy as np
+        from services.memory_manager import _quantize_embedding
+
+        rng = np.random.default_rng(0)
+        embedding = rng.normal(size=64).tolist()
+        quantized = np.frombuffer(_quantize_embedding(embedding), dtype=np.int8)
+
+        assert quantized.shape == (64,)
+        assert np.abs(quantized).max() == 127
+        original = np.array(embedding)
+        cosine = quantized @ original / (np.linalg.norm(quantized) * np.linalg.norm(original))
+        assert cosine > 0.999
+
+        np.testing.assert_array_equal(
+            np.frombuffer(_quantize_embedding([0.5, -1.0, 0.25]), dtype=np.int8), [64, -127, 32]
+        )
+        assert _quantize_embedding(None) is None
+        assert _quantize_embedding([]) is None
 
 
 class TestProactiveAgent:
@@ -264,6 +446,90 @@ class TestHabitEngine:
         is_valid = habit_engine._validate_pattern_strength(pattern)
         assert isinstance(is_valid, bool)
 
+    def test_extract_time_from_content(self, habit_engine):
+        """Test explicit clock times are parsed from memory content"""
+        timestamp = datetime(2024, 1, 15, 9, 0)
+
+        assert habit_engine._extract_time_from_content("wake up 7am", timestamp)["time_pattern"] == "07:00"
+        assert habit_engine._extract_time_from_content("gym at 6:30 pm", timestamp)["time_pattern"] == "18:30"
+        assert habit_engine._extract_time_from_content("lunch 12 pm", timestamp)["time_pattern"] == "12:00"
+        assert habit_engine._extract_time_from_content("tea at 5 o'clock", timestamp)["time_pattern"] == "05:00"
+        # The colon is optional, so four bare digits read as a clock time
+        assert habit_engine._extract_time_from_content("run at 0630", timestamp)["time_pattern"] == "06:30"
+        assert habit_engine._extract_time_from_content("taxes for 2024", timestamp)["time_pattern"] == "20:24"
+
+    @pytest.mark.external
+    @pytest.mark.asyncio
+    async def test_persist_habits_writes_rows(self, habit_engine, postgres_sessions):
+        """Test detected habits are upserted, one row per pattern type, with predictions"""
+        from sqlalchemy import select
+        from db.models import User, UserHabit
+        
+        async with postgres_sessions() as db:
+            user = User(phone_number="+15550001111")
+            db.add(user)
+            await db.commit()
+            user_id = user.id
+        
+        habits = [
+            {"pattern_type": "frequency_based", "pattern_data": {"memory_type": "sms", "frequency_hours": 12}, "confidence": 0.7, "observations": 8},
+            {"pattern_type": "sequence_based", "pattern_data": {"sequence": ["sms", "call"]}, "confidence": 0.6, "observations": 4}
+        ]
+        await habit_engine._persist_habits(user_id, habits)
+        
+        # A second analysis updates the same rows, keeping the higher confidence
+        await habit_engine._persist_habits(user_id, [dict(habits[0], confidence=0.5, observations=9)])
+        
+        async with postgres_sessions() as db:
+            rows = (await db.execute(select(UserHabit).where(UserHabit.user_id == user_id))).scalars().all()
+        
+        by_type = {row.pattern_type: row for row in rows}
+        assert sorted(by_type) == ["frequency_based", "sequence_based"]
+        assert by_type["frequency_based"].confidence == 0.7
+        assert by_type["frequency_based"].observation_count == 9
+        assert all(row.next_predicted is not None for row in rows)
+    
+    @pytest.mark.asyncio
+    async def test_persist_failure_drops_cached_analysis(self, habit_engine, sqlite_sessions):
+        """Test a failed habit write forgets the cached analysis so the next call retries it"""
+        habit_engine._analysis_cache[1] = ((datetime.utcnow(), 1, 1), [], datetime.utcnow())
+        
+        # Missing keys make the upsert fail before it reaches the database
+        await habit_engine._persist_habits(1, [{"pattern_type": "time_based"}])
+        
+        assert 1 not in habit_engine._analysis_cache
+    
+    @pytest.mark.asyncio
+    async def test_close_waits_for_pending_writes(self, habit_engine):
+        """Test close() lets in-flight habit persistence finish before returning"""
+        release = asyncio.Event()
+        finished = []
+        
+        async def write():
+            await release.wait()
+            finished.append(True)
+        
+        task = asyncio.create_task(write())
+        habit_engine._pending_writes.add(task)
+        task.add_done_callback(habit_engine._pending_writes.discard)
+        asyncio.get_running_loop().call_soon(release.set)
+        
+        await habit_engine.close()
+        assert finished == [True]
+    
+    @pytest.mark.asyncio
+    async def test_cached_habits_are_copied(self, habit_engine):
+        """Test callers can modify returned habits without changing the cached ones"""
+        cached = [{"id": 1, "pattern_type": "time_based", "pattern_data": {"action": "wake up"}}]
+        habit_engine._habits_cache["user"] = (cached, datetime.utcnow())
+        
+        habits = await habit_engine.get_user_habits("user")
+        habits[0]["pattern_data"]["action"] = "changed"
+        habits.append({"id": 2})
+        
+        assert cached == [{"id": 1, "pattern_type": "time_based", "pattern_data": {"action": "wake up"}}]
+        assert json.loads(await habit_engine.get_user_habits_json("user")) == cached
+
 
 class TestUserManager:
     """Test user management and preferences"""
@@ -590,6 +856,156 @@ class TestErrorHandling:
             assert "error" in str(e) or "connection" in str(e).lower()
 
 
+class TestOAuthSingleFlight:
+    """Test de-duplication of concurrent Google token calls"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_callers_share_one_call(self):
+        """Test callers for the same key await one run and later callers start a fresh one"""
+        from services.oauth_service import _single_flight
+
+        inflight = {}
+        calls = []
+        release = asyncio.Event()
+
+        async def refresh():
+            calls.append(len(calls) + 1)
+            await release.wait()
+            return {"success": True, "call": len(calls)}
+
+        waiters = [asyncio.create_task(_single_flight(inflight, 7, refresh)) for _ in range(3)]
+        await asyncio.sleep(0)
+        assert list(inflight) == [7]
+
+        release.set()
+        results = await asyncio.gather(*waiters)
+        assert calls == [1]
+        assert results == [{"success": True, "call": 1}] * 3
+        assert inflight == {}
+
+        assert await _single_flight(inflight, 7, refresh) == {"success": True, "call": 2}
+
+    @pytest.mark.asyncio
+    async def test_cancelled_caller_leaves_shared_call_running(self):
+        """Test cancelling one waiter doesn't cancel the call others are awaiting"""
+        from services.oauth_service import _single_flight
+
+        inflight = {}
+        release = asyncio.Event()
+
+        async def exchange():
+            await release.wait()
+            return {"success": True}
+
+        cancelled = asyncio.create_task(_single_flight(inflight, "code", exchange))
+        waiting = asyncio.create_task(_single_flight(inflight, "code", exchange))
+        await asyncio.sleep(0)
+
+        cancelled.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await cancelled
+
+        release.set()
+        assert await waiting == {"success": True}
+
+
+class TestDigestService:
+    """Test digest scheduling queries"""
+    
+    @pytest.mark.external
+    @pytest.mark.asyncio
+    async def test_digest_recipients_resolve_timezones(self, postgres_engine):
+        """Test recipients get a valid timezone from the JSONB preference, users.timezone or UTC"""
+        from services.digest_service import _DIGEST_RECIPIENTS_SQL
+        
+        async with postgres_engine.connect() as conn:
+            # Temp tables shadow any real ones and vanish with the connection
+            await conn.execute(text("""
+                CREATE TEMP TABLE users (
+                    id SERIAL PRIMARY KEY,
+                    phone_number VARCHAR,
+                    name VARCHAR,
+                    is_active BOOLEAN DEFAULT TRUE,
+                    timezone VARCHAR(50) DEFAULT 'UTC'
+                )
+            """))
+            await conn.execute(text("""
+                CREATE TEMP TABLE user_preferences (
+                    id SERIAL PRIMARY KEY,
+                    user_id INTEGER NOT NULL,
+                    preference_key VARCHAR NOT NULL,
+                    preference_value JSONB NOT NULL
+                )
+            """))
+            await conn.execute(text("""
+                INSERT INTO users (id, phone_number, name, is_active, timezone) VALUES
+                    (1, '+15550000001', 'pref', true, 'UTC'),
+                    (2, '+15550000002', 'bad pref', true, 'Asia/Tokyo'),
+                    (3, '+15550000003', 'bad column', true, 'Not/A_Zone'),
+                    (4, '+15550000004', 'inactive', false, 'UTC')
+            """))
+            await conn.execute(text("""
+                INSERT INTO user_preferences (user_id, preference_key, preference_value) VALUES
+                    (1, 'timezone', '"America/New_York"'),
+                    (2, 'timezone', '"Mars/Olympus_Mons"')
+            """))
+            
+            before = datetime.now(ZoneInfo("UTC"))
+            result = await conn.execute(_DIGEST_RECIPIENTS_SQL, {
+                "local_hours": list(range(24)),
+                "after_id": 0,
+                "page_size": 100
+            })
+            after = datetime.now(ZoneInfo("UTC"))
+            recipients = {row["id"]: row for row in result.mappings().all()}
+        
+        expected = {1: "America/New_York", 2: "Asia/Tokyo", 3: "UTC"}
+        assert {user_id: row["timezone"] for user_id, row in recipients.items()} == expected
+        for user_id, zone in expected.items():
+            local_hours = {moment.astimezone(ZoneInfo(zone)).hour for moment in (before, after)}
+            assert recipients[user_id]["local_hour"] in local_hours
+
+    @pytest.mark.parametrize("start_time,expected", [
+        ("2024-06-03T07:05:00Z", "07:05 AM"),
+        ("2024-06-03T00:00:00", "12:00 AM"),
+        ("2024-06-03T12:30:00+00:00", "12:30 PM"),
+        ("2024-06-03T23:59:00", "11:59 PM"),
+        (datetime(2024, 6, 3, 13, 0), "01:00 PM"),
+        ("not a time", "TBD")
+    ])
+    def test_format_event_time(self, start_time, expected):
+        """Test event times render as zero-padded 12-hour clock times"""
+        from services.digest_service import digest_service
+        assert digest_service._format_event_time(start_time) == expected
+
+    def test_format_event_time_matches_strftime(self):
+        """Test the hand-built format agrees with strftime("%I:%M %p") for every hour"""
+        from services.digest_service import digest_service
+        for hour in range(24):
+            moment = datetime(2024, 6, 3, hour, 7)
+            assert digest_service._format_event_time(moment.isoformat()) == moment.strftime("%I:%M %p")
+
+    @pytest.mark.parametrize("timezone_name,digest_hour,expected", [
+        ("America/New_York", 7, True),  # 11:30 UTC is 07:30 EDT
+        ("America/New_York", 11, False),
+        ("Asia/Tokyo", 20, True),  # 20:30 JST
+        (None, 11, True),  # Unset zones count as UTC
+        ("Not/A_Zone", 11, True),  # So do names the tz database doesn't know
+        ("Not/A_Zone", 7, False)
+    ])
+    def test_is_local_digest_hour(self, monkeypatch, timezone_name, digest_hour, expected):
+        """Test on-demand sends use the scheduled tick's exact local digest hour"""
+        import services.digest_service as digest_service
+
+        class FrozenDatetime(datetime):
+            @classmethod
+            def now(cls, tz=None):
+                return datetime(2024, 6, 3, 11, 30, tzinfo=ZoneInfo("UTC")).astimezone(tz)
+
+        monkeypatch.setattr(digest_service, "datetime", FrozenDatetime)
+        assert digest_service._is_local_digest_hour(timezone_name, digest_hour) is expected
+
+
 if __name__ == "__main__":
     # Run all tests
     pytest.main([__file__, "-v", "--tb=short"])
@@ -68,12 +68,26 @@ DEVICE_CAPABILITIES = {
 MAX_MEMORY_RECALL = 100
 MAX_CONTEXT_ITEMS = 50
 CACHE_TTL = 86400  # 24 hours in seconds
+REDIS_MAX_CONNECTIONS = 64  # Pooled Redis connections per process
+EMBEDDING_CACHE_TTL = 30 * 86400  # 30 days, embeddings cached by content hash
 
 # Proactive automation constants
 PROACTIVE_THRESHOLD = 0.6
 DEFAULT_DIGEST_TIME = "08:00"
 DEFAULT_PROACTIVE_INTERVAL = 300  # 5 minutes
 HABIT_CONFIDENCE_THRESHOLD = 0.6
+HABIT_ANALYSIS_CACHE_TTL = 300  # 5 minutes, reuse analysis while a user's memories are unchanged
+HABIT_LIST_CACHE_TTL = 60  # Stored habits served to back-to-back callers
+HABIT_MEMORY_BATCH_SIZE = 32  # Habit execution memories written per batch
+HABIT_MEMORY_FLUSH_INTERVAL = 0.5  # Seconds between habit execution memory batches
+DIGEST_CONCURRENCY = 20  # Max digests being built/sent at once
+DIGEST_SMS_RATE_PER_SEC = 50  # Sustained digest SMS sends per second; bursts up to the same
+DIGEST_USER_PAGE_SIZE = 1000  # Users loaded and dispatched per digest page
+MORNING_DIGEST_HOUR = 7  # Local hour the morning digest goes out
+EVENING_DIGEST_HOUR = 19  # Local hour the evening digest goes out
+USER_LOOKUP_CACHE_TTL = 3600  # 1 hour, for per-user timezone/phone lookups
+USER_LOOKUP_CACHE_SIZE = 10000
+DIGEST_CONTENT_CACHE_SIZE = 4096  # Digest bodies, keyed per user/type/minute
 
 # Contact resolution constants
 MAX_CONTACT_AMBIGUITY = 3
@@ -174,6 +188,12 @@ MEMORY_CLEANUP_INTERVAL = 3600  # 1 hour
 
 # Integration limits
 MAX_OAUTH_INTEGRATIONS = 5
+OAUTH_HTTP_TIMEOUT = 10.0  # Seconds per Google OAuth request
+OAUTH_HTTP_MAX_CONNECTIONS = 100
+OAUTH_HTTP_MAX_KEEPALIVE = 20  # Idle connections kept open to Google between OAuth calls
+OAUTH_INTEGRATION_CACHE_TTL = 300  # 5 minutes, for OAuth integration lookups
+OAUTH_INTEGRATION_CACHE_SIZE = 10000
+OAUTH_REFRESH_SKEW_SECONDS = 60  # Refresh OAuth tokens this long before they expire
 MAX_EXTERNAL_CONTACTS = 100
 MAX_USER_MEMORIES = 10000
 MAX_HABIT_PATTERNS = 50